@@ -0,0 +1,70 @@
+from time import monotonic
+
+
+class MemoryRedis(object):
+    r"""Just enough of the redis-py client, kept in a dict, to benchmark the
+    session interfaces offline without network noise."""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+
+    def _alive(self, name):
+        exp = self.expiry.get(name)
+        if exp is not None and exp <= monotonic():
+            self.data.pop(name, None)
+            self.expiry.pop(name, None)
+        return name in self.data
+
+    def get(self, name):
+        return self.data[name] if self._alive(name) else None
+
+    def set(self, name, value, ex=None, xx=False, keepttl=False):
+        if xx and not self._alive(name):
+            return None
+        self.data[name] = value
+        if ex is not None:
+            self.expiry[name] = monotonic() + ex
+        elif not keepttl:
+            self.expiry.pop(name, None)
+        return True
+
+    def setex(self, name, time, value):
+        return self.set(name, value, ex=time)
+
+    def expire(self, name, time):
+        if not self._alive(name):
+            return False
+        self.expiry[name] = monotonic() + time
+        return True
+
+    def ttl(self, name):
+        if not self._alive(name):
+            return -2
+        exp = self.expiry.get(name)
+        return -1 if exp is None else int(exp - monotonic())
+
+    def delete(self, *names):
+        return sum(self.data.pop(n, None) is not None for n in names)
+
+    def pipeline(self, transaction=True):
+        return MemoryPipeline(self)
+
+
+class MemoryPipeline(object):
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        method = getattr(self.redis, name)
+
+        def queue(*args, **kwargs):
+            self.commands.append((method, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        commands, self.commands = self.commands, []
+        return [method(*args, **kwargs) for method, args, kwargs in commands]
@@ -0,0 +1,114 @@
+r"""Run the fourutils benchmark suite.
+
+    python -m benchmarks [-k filter] [-o results.json] [-c baseline.json]
+
+Results are written as JSON so runs from different versions can be compared
+with ``--compare``."""
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+from datetime import datetime
+
+from .cases import cases
+
+
+def get_version():
+    try:
+        from importlib.metadata import version
+        return version('fourutils')
+    except Exception:
+        return 'dev'
+
+
+def run_case(setup, repeat, min_time):
+    func = setup()
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    # Scale up so each repeat runs for roughly min_time seconds.
+    number = max(number, int(number * min_time / max(elapsed, 1e-9)))
+    timings = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'number': number,
+        'repeat': repeat,
+        'best': min(timings),
+        'mean': sum(timings) / len(timings),
+        'ops_per_sec': 1 / min(timings),
+    }
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+
+    regressions = 0
+    print(f'\nCompared to {baseline_path}:')
+    for name, result in results.items():
+        old = baseline.get(name)
+        if 'best' not in result or not old or 'best' not in old:
+            continue
+        ratio = result['best'] / old['best']
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f'  {name:<36} {ratio:6.2f}x{flag}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('-k', '--filter', default='',
+                        help='only run cases containing this string')
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    parser.add_argument('-t', '--min-time', type=float, default=0.2,
+                        help='seconds per repeat')
+    parser.add_argument('-o', '--output',
+                        help='defaults to benchmarks/results/<version>.json')
+    parser.add_argument('-c', '--compare',
+                        help='baseline results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='slowdown ratio counted as a regression')
+    args = parser.parse_args(argv)
+
+    version = get_version()
+    results = {}
+    for name, setup in cases.items():
+        if args.filter not in name:
+            continue
+        try:
+            results[name] = run_case(setup, args.repeat, args.min_time)
+        except ImportError as e:
+            results[name] = {'skipped': str(e)}
+            print(f'{name:<36} skipped ({e})')
+            continue
+        except Exception as e:
+            results[name] = {'error': repr(e)}
+            print(f'{name:<36} failed ({e!r})')
+            continue
+        r = results[name]
+        print(f'{name:<36} {r["best"] * 1e6:12.2f} us {r["ops_per_sec"]:12.0f} ops/s')
+
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'results', f'{version}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'version': version,
+            'created_at': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'results': results,
+        }, f, indent=2)
+    print(f'\nWrote {output}')
+
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
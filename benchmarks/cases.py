@@ -0,0 +1,289 @@
+r"""Benchmark cases for the fourutils hot paths.
+
+Each case is a setup function returning the zero argument callable to time.
+Setup raising ImportError marks the case as skipped, so the suite still runs
+with only some of the extras installed."""
+import os
+from collections import OrderedDict
+from hashlib import md5
+from tempfile import mkdtemp
+
+from .MemoryRedis import MemoryRedis
+
+cases = OrderedDict()
+
+
+def case(name):
+    def decorator(f):
+        cases[name] = f
+        return f
+    return decorator
+
+
+SESSION_DATA = {
+    '_user_id': '42',
+    '_fresh': True,
+    '_id': md5(b'benchmark').hexdigest() * 2,
+    'csrf_token': md5(b'csrf').hexdigest(),
+    'recent_searches': [f'query {i}' for i in range(20)],
+}
+
+
+def _session_case(interface_cls):
+    from flask import Flask
+
+    app = Flask(__name__)
+    # Flask 2.3 dropped the attribute, the interfaces still read it.
+    app.session_cookie_name = app.config['SESSION_COOKIE_NAME']
+    interface = interface_cls(MemoryRedis())
+    interface.redis.set('session:bench', interface.serializer.dumps(SESSION_DATA))
+    ctx = app.test_request_context(
+        headers={'Cookie': f'{app.session_cookie_name}=bench'})
+    ctx.push()
+    from flask import request
+    response = app.response_class()
+
+    def run():
+        session = interface.open_session(app, request)
+        session['counter'] = session.get('counter', 0) + 1
+        interface.save_session(app, session, response)
+    return run
+
+
+@case('session_open_save_pickle')
+def session_open_save_pickle():
+    from fourutils.flask.RedisSessionInterface import RedisSessionInterface
+    return _session_case(RedisSessionInterface)
+
+
+@case('session_open_save_msgpack')
+def session_open_save_msgpack():
+    from fourutils.flask.msgpack import MsgpackRedisSessionInterface
+    return _session_case(MsgpackRedisSessionInterface)
+
+
+def _config_manager(n_keys=50):
+    from sqlalchemy import Column, LargeBinary, String, create_engine
+    from sqlalchemy.ext.declarative import declarative_base
+    from sqlalchemy.orm import scoped_session, sessionmaker
+
+    from fourutils.sqla import UserConfigManager
+
+    engine = create_engine('sqlite://')
+    session = scoped_session(sessionmaker(bind=engine))
+    Base = declarative_base()
+
+    class KV(Base):
+        __tablename__ = 'config'
+        query = session.query_property()
+        key = Column(String, primary_key=True)
+        value = Column(LargeBinary)
+
+    Base.metadata.create_all(engine)
+    manager = UserConfigManager(session, KV)
+    for i in range(n_keys):
+        manager.set(f'key_{i}', {'value': i, 'enabled': bool(i % 2)})
+    return manager
+
+
+@case('user_config_get_uncached')
+def user_config_get_uncached():
+    manager = _config_manager()
+
+    def run():
+        manager.cache.clear()
+        for i in range(10):
+            manager.get(f'key_{i}')
+    return run
+
+
+@case('user_config_get_cached')
+def user_config_get_cached():
+    manager = _config_manager()
+
+    def run():
+        for i in range(10):
+            manager.get(f'key_{i}')
+    return run
+
+
+@case('user_config_get_all')
+def user_config_get_all():
+    manager = _config_manager()
+    return manager.get_all
+
+
+def _json_encoded_dict_case(codec):
+    from fourutils.sqla.types import JSONEncodedDict
+
+    column = JSONEncodedDict(codec=codec)
+    value = {'rows': [{'id': i, 'name': f'row {i}', 'tags': ['a', 'b']}
+                      for i in range(50)]}
+
+    def run():
+        column.process_result_value(
+            column.process_bind_param(value, None), None)
+    return run
+
+
+@case('json_encoded_dict_bind_result')
+def json_encoded_dict_bind_result():
+    return _json_encoded_dict_case('json')
+
+
+@case('json_encoded_dict_bind_result_orjson')
+def json_encoded_dict_bind_result_orjson():
+    import orjson  # noqa, skip the case if it's missing
+    return _json_encoded_dict_case('orjson')
+
+
+@case('server_sent_event_encode')
+def server_sent_event_encode():
+    from fourutils import ServerSentEvent
+
+    data = {'type': 'update', 'items': list(range(20))}
+
+    def run():
+        ServerSentEvent(data).encode()
+    return run
+
+
+@case('filter_parser_match_all')
+def filter_parser_match_all():
+    from fourutils import FilterParser
+
+    parser = FilterParser()
+    query = 'status:open assignee:"Jane Doe" label:bug priority:high some free text'
+
+    def run():
+        list(parser.match_all(query))
+    return run
+
+
+@case('filter_parser_parse_uncached')
+def filter_parser_parse_uncached():
+    from fourutils import FilterParser
+
+    parser = FilterParser()
+    query = 'status:open assignee:"Jane Doe" label:bug priority:high some free text'
+
+    def run():
+        parser._parse(query)
+    return run
+
+
+@case('base36encode')
+def base36encode():
+    from fourutils import base36encode
+
+    def run():
+        for i in range(1000, 2000):
+            base36encode(i * 7919)
+    return run
+
+
+@case('base36_encode_many')
+def base36_encode_many():
+    from fourutils.base36 import encode_many
+
+    numbers = [i * 7919 for i in range(1000, 2000)]
+
+    def run():
+        encode_many(numbers)
+    return run
+
+
+@case('sortable_id_generate')
+def sortable_id_generate():
+    from fourutils import SortableIdGenerator
+
+    generator = SortableIdGenerator()
+
+    def run():
+        for _ in range(1000):
+            generator.generate()
+    return run
+
+
+@case('identicon_dump')
+def identicon_dump():
+    from fourutils import IdenticonGenerator
+
+    generator = IdenticonGenerator()
+    hashes = [md5(str(i).encode()).hexdigest() for i in range(10)]
+
+    def run():
+        for h in hashes:
+            generator.dump(h)
+    return run
+
+
+@case('identicon_dump_png')
+def identicon_dump_png():
+    from PIL import Image  # noqa, skip the case if it's missing
+
+    from fourutils import IdenticonGenerator
+
+    generator = IdenticonGenerator()
+    hashes = [md5(str(i).encode()).hexdigest() for i in range(10)]
+
+    def run():
+        for h in hashes:
+            generator.dump_png(h)
+    return run
+
+
+def _push_package_builder():
+    from OpenSSL import crypto
+    from PIL import Image
+
+    from fourutils.webnotifications import PushPackageBuilder
+
+    tmp = mkdtemp()
+    icon_path = os.path.join(tmp, 'icon.png')
+    Image.new('RGBA', (512, 512), (30, 120, 200, 255)).save(icon_path)
+
+    key = crypto.PKey()
+    key.generate_key(crypto.TYPE_RSA, 2048)
+    cert = crypto.X509()
+    cert.get_subject().CN = 'fourutils benchmark'
+    cert.set_serial_number(1)
+    cert.gmtime_adj_notBefore(0)
+    cert.gmtime_adj_notAfter(3600)
+    cert.set_issuer(cert.get_subject())
+    cert.set_pubkey(key)
+    cert.sign(key, 'sha256')
+    key_path = os.path.join(tmp, 'cert.pem')
+    with open(key_path, 'wb') as f:
+        f.write(crypto.dump_certificate(crypto.FILETYPE_PEM, cert))
+        f.write(crypto.dump_privatekey(crypto.FILETYPE_PEM, key))
+
+    builder = PushPackageBuilder(icon_path, {
+        'websiteName': 'Benchmark',
+        'websitePushID': 'web.com.example.benchmark',
+        'allowedDomains': ['https://example.com'],
+        'urlFormatString': 'https://example.com/%@',
+        'webServiceURL': 'https://example.com/push',
+    }, key_path)
+    return builder
+
+
+@case('push_package_build')
+def push_package_build():
+    builder = _push_package_builder()
+
+    def run():
+        builder.packages.clear()
+        builder.build_pushpackage(merge_website_dict={
+            'authenticationToken': '0123456789abcdef'})
+    return run
+
+
+@case('push_package_build_cached')
+def push_package_build_cached():
+    builder = _push_package_builder()
+
+    def run():
+        builder.build_pushpackage(merge_website_dict={
+            'authenticationToken': '0123456789abcdef'})
+    return run
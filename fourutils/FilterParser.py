@@ -1,20 +1,90 @@
-from typing import Iterator, Tuple, Optional
+from types import MappingProxyType
+from typing import Iterator, Mapping, NamedTuple, Tuple, Optional
 import re
 
+from .LRUCache import LRUCache
+
+
+class FilterToken(NamedTuple):
+    key: str
+    value: str
+    # Includes the leading '-' of negated filters.
+    span: Tuple[int, int]
+    quoted: bool
+    # Written as -key:value
+    negated: bool
+
+
+class ParsedQuery(NamedTuple):
+    r"""The result of :meth:`FilterParser.parse`. ``index`` maps every key to
+    its tokens in order, so repeated keys are kept, and ``text`` is the query
+    with all filters removed."""
+
+    query: str
+    tokens: Tuple[FilterToken, ...]
+    index: Mapping[str, Tuple[FilterToken, ...]]
+    text: str
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def get(self, key: str, default=None) -> Optional[str]:
+        tokens = self.index.get(key)
+        return tokens[0].value if tokens else default
+
+    def get_all(self, key: str) -> Tuple[str, ...]:
+        return tuple(token.value for token in self.index.get(key, ()))
+
 
 class FilterParser(object):
     expression = re.compile(r'(?:([\w\d]+):(?:"(.+)"|((?!")\S+)))')
+    # Shared by all instances, parsers tend to be created per request.
+    cache = LRUCache(1024)
 
-    def match(self, key: str, query_str: str) -> Optional[Tuple[str, str]]:
-        for m_key, m_value in self.match_all(query_str):
-            if m_key == key:
-                return m_value
-        return None
+    def parse(self, query_str: str) -> ParsedQuery:
+        r"""Parse ``query_str`` in a single pass. Results are cached, so
+        calling this again for the same query is a dict lookup."""
+        cache_key = (self.expression, query_str)
+        parsed = self.cache.get(cache_key)
+        if parsed is None:
+            parsed = self._parse(query_str)
+            self.cache.set(cache_key, parsed)
+        return parsed
 
-    def match_all(self, query_str: str) -> Iterator[Tuple[str, str]]:
+    def _parse(self, query_str: str) -> ParsedQuery:
+        tokens = []
+        index = {}
+        text = []
+        last = 0
         for res in self.expression.finditer(query_str):
-            val = res.group(2) or res.group(3)
-            yield res.group(1), val
+            start, end = res.span()
+            quoted = res.group(2) is not None
+            negated = start > 0 and query_str[start - 1] == '-' and \
+                (start == 1 or query_str[start - 2].isspace())
+            if negated:
+                # The '-' is part of the filter, not the free text.
+                start -= 1
+            token = FilterToken(res.group(1), res.group(2) if quoted else res.group(3),
+                                (start, end), quoted, negated)
+            tokens.append(token)
+            index.setdefault(token.key, []).append(token)
+            text.append(query_str[last:start])
+            last = end
+        text.append(query_str[last:])
+
+        return ParsedQuery(
+            query_str,
+            tuple(tokens),
+            MappingProxyType({key: tuple(v) for key, v in index.items()}),
+            ''.join(text).strip(),
+        )
+
+    def match(self, key: str, query_str: str) -> Optional[str]:
+        return self.parse(query_str).get(key)
+
+    def match_all(self, query_str: str) -> Iterator[Tuple[str, str]]:
+        for token in self.parse(query_str).tokens:
+            yield token.key, token.value
 
     def clear_filters(self, query_str: str) -> str:
-        return self.expression.sub('', query_str).strip()
+        return self.parse(query_str).text
@@ -0,0 +1,49 @@
+from bisect import bisect
+from hashlib import md5
+
+
+class HashRing(object):
+    r"""A consistent hash ring mapping keys onto named nodes.
+
+    Each node is placed on the ring ``replicas`` times, so adding or removing
+    a node only moves roughly ``1 / len(nodes)`` of the keys."""
+
+    def __init__(self, nodes=(), replicas=100):
+        self.replicas = replicas
+        self.nodes = set()
+        self.ring = {}
+        self.sorted_hashes = []
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, node):
+        return node in self.nodes
+
+    @staticmethod
+    def hash(key):
+        return int.from_bytes(md5(key.encode()).digest()[:8], 'big')
+
+    def add(self, node):
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for i in range(self.replicas):
+            self.ring[self.hash(f'{node}:{i}')] = node
+        self.sorted_hashes = sorted(self.ring)
+
+    def remove(self, node):
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        for i in range(self.replicas):
+            self.ring.pop(self.hash(f'{node}:{i}'), None)
+        self.sorted_hashes = sorted(self.ring)
+
+    def get_node(self, key):
+        if not self.ring:
+            raise KeyError('HashRing has no nodes')
+        i = bisect(self.sorted_hashes, self.hash(key))
+        return self.ring[self.sorted_hashes[i % len(self.sorted_hashes)]]
@@ -0,0 +1,153 @@
+import argparse
+import os
+import sys
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import md5
+from itertools import islice
+from time import monotonic
+
+from .IdenticonGenerator import IdenticonGenerator
+
+
+def _render_chunk(generator, format, hashes):
+    grids = generator.get_grids(hashes)
+    if format == 'svg':
+        return [generator.dump(hash, grid).encode()
+                for hash, grid in zip(hashes, grids)]
+    return [generator.dump_png(hash, grid) for hash, grid in zip(hashes, grids)]
+
+
+class IdenticonBatch(object):
+    r"""Renders identicons for many hashes at once, for pre-generating
+    avatars in bulk.
+
+    Hashes are split into chunks of ``chunk_size``, and each chunk's grids
+    are computed together with :meth:`IdenticonGenerator.get_grids` in one
+    of ``workers`` processes (all cores by default, ``0`` renders in this
+    process). ``progress`` is called with ``(done, total, elapsed)`` after
+    every chunk, ``total`` being ``None`` when the hashes aren't sized.
+
+        batch = IdenticonBatch(IdenticonGenerator(image_size=128))
+        batch.write_zip(hashes, 'avatars.zip')"""
+
+    def __init__(self, generator=None, format='png', workers=None,
+                 chunk_size=256, progress=None):
+        if format not in ('svg', 'png'):
+            raise ValueError(f'Unknown identicon format {format!r}')
+        self.generator = generator or IdenticonGenerator()
+        self.format = format
+        self.workers = os.cpu_count() if workers is None else workers
+        self.chunk_size = chunk_size
+        self.progress = progress
+
+    def get_filename(self, hash):
+        return f'{hash}.{self.format}'
+
+    def chunks(self, hashes):
+        hashes = iter(hashes)
+        while True:
+            chunk = list(islice(hashes, self.chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def render(self, hashes):
+        r"""Yield ``(hash, data)`` for every hash, in order."""
+        total = len(hashes) if hasattr(hashes, '__len__') else None
+        done = 0
+        start = monotonic()
+
+        for chunk, results in self._render_chunks(self.chunks(hashes)):
+            yield from zip(chunk, results)
+            done += len(chunk)
+            if self.progress is not None:
+                self.progress(done, total, monotonic() - start)
+
+    def _render_chunks(self, chunks):
+        if not self.workers:
+            for chunk in chunks:
+                yield chunk, _render_chunk(self.generator, self.format, chunk)
+            return
+
+        with ProcessPoolExecutor(self.workers) as executor:
+            # Keep a few chunks per worker in flight, rather than submitting
+            # everything and holding all the results in memory.
+            pending = deque()
+            for chunk in chunks:
+                pending.append((chunk, executor.submit(
+                    _render_chunk, self.generator, self.format, chunk)))
+                if len(pending) >= self.workers * 4:
+                    chunk, future = pending.popleft()
+                    yield chunk, future.result()
+            while pending:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+
+    def write_directory(self, hashes, directory):
+        os.makedirs(directory, exist_ok=True)
+        for hash, data in self.render(hashes):
+            with open(os.path.join(directory, self.get_filename(hash)), 'wb') as f:
+                f.write(data)
+
+    def write_zip(self, hashes, file):
+        # PNGs are already compressed.
+        compression = zipfile.ZIP_DEFLATED if self.format == 'svg' else zipfile.ZIP_STORED
+        with zipfile.ZipFile(file, 'w', compression) as archive:
+            for hash, data in self.render(hashes):
+                archive.writestr(self.get_filename(hash), data)
+
+
+def _print_progress(done, total, elapsed):
+    rate = done / elapsed if elapsed else 0
+    of = f'/{total}' if total is not None else ''
+    print(f'\r{done}{of} identicons, {rate:.0f}/s', end='', file=sys.stderr,
+          flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='fourutils-identicons',
+        description='Pre-generate identicons for a list of hashes.')
+    parser.add_argument('input', type=argparse.FileType('r'),
+                        help='file with one hash per line, - for stdin')
+    parser.add_argument('output',
+                        help='directory to write to, or a path ending in .zip')
+    parser.add_argument('-f', '--format', choices=('png', 'svg'), default='png')
+    parser.add_argument('-s', '--size', type=int, default=64,
+                        help='image size in pixels')
+    parser.add_argument('-p', '--pixels', type=int, default=5,
+                        help='cells along each side')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='worker processes, 0 to render in process')
+    parser.add_argument('--chunk-size', type=int, default=256)
+    parser.add_argument('--md5', action='store_true',
+                        help='md5 each line first, e.g. for email addresses')
+    args = parser.parse_args(argv)
+
+    with args.input:
+        hashes = [line.strip() for line in args.input if line.strip()]
+    if args.md5:
+        hashes = [md5(h.encode()).hexdigest() for h in hashes]
+
+    batch = IdenticonBatch(
+        IdenticonGenerator(image_size=args.size, pixels=args.pixels),
+        format=args.format, workers=args.workers, chunk_size=args.chunk_size,
+        progress=_print_progress)
+
+    start = monotonic()
+    try:
+        if args.output.endswith('.zip'):
+            batch.write_zip(hashes, args.output)
+        else:
+            batch.write_directory(hashes, args.output)
+    except ValueError as e:
+        parser.error(f'{e}, pass --md5 to hash each line first')
+    elapsed = monotonic() - start
+    print(f'\nWrote {len(hashes)} identicons to {args.output} in {elapsed:.1f}s',
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
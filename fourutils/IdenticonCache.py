@@ -0,0 +1,92 @@
+import os
+from hashlib import sha1
+from tempfile import NamedTemporaryFile
+
+from .IdenticonGenerator import IdenticonGenerator
+from .LRUCache import LRUCache
+from .log import make_logger
+
+
+class IdenticonCache(object):
+    r"""Caches rendered identicons by hash and generator settings.
+
+    ETags are derived from the hash, the settings and :attr:`VERSION` alone,
+    so they're stable across processes and restarts, and a conditional
+    request can be answered without rendering anything. Rendered images are
+    kept in a bounded in-memory LRU and, with a ``directory``, written to
+    disk as ``<etag>.<format>`` to be shared between workers and survive
+    restarts.
+
+        identicons = IdenticonCache(IdenticonGenerator(), directory='/var/cache/identicons')
+
+        @app.route('/avatar/<hash>.svg')
+        def avatar(hash):
+            etag = identicons.get_etag(hash)
+            if etag in request.if_none_match:
+                return Response(status=304)
+            rv = Response(identicons.get(hash), mimetype='image/svg+xml')
+            rv.set_etag(etag)
+            return rv"""
+
+    # Bump when the rendering changes, to invalidate ETags and stored files.
+    VERSION = 1
+
+    renderers = {
+        'svg': lambda generator, hash: generator.dump(hash).encode(),
+        'png': lambda generator, hash: generator.dump_png(hash),
+    }
+
+    def __init__(self, generator=None, maxsize=1024, directory=None):
+        self.generator = generator or IdenticonGenerator()
+        self.cache = LRUCache(maxsize)
+        self.directory = directory
+        self.log = make_logger(__name__)
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def get_etag(self, hash, format='svg'):
+        # Also guards get, before format ends up in a path.
+        if format not in self.renderers:
+            raise ValueError(f'Unknown identicon format {format!r}')
+        key = repr((self.VERSION, format, hash.lower(), self.generator.settings))
+        return sha1(key.encode()).hexdigest()
+
+    def get(self, hash, format='svg'):
+        r"""The rendered identicon for ``hash`` as bytes."""
+        etag = self.get_etag(hash, format)
+        data = self.cache.get(etag)
+        if data is not None:
+            return data
+
+        data = self.load(etag, format)
+        if data is None:
+            data = self.renderers[format](self.generator, hash)
+            self.store(etag, format, data)
+        self.cache.set(etag, data)
+        return data
+
+    def get_path(self, etag, format):
+        return os.path.join(self.directory, f'{etag}.{format}')
+
+    def load(self, etag, format):
+        if self.directory is None:
+            return None
+        try:
+            with open(self.get_path(etag, format), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def store(self, etag, format, data):
+        if self.directory is None:
+            return
+        try:
+            # Write then rename, so other workers never read a partial file.
+            with NamedTemporaryFile(dir=self.directory, delete=False) as f:
+                f.write(data)
+            os.replace(f.name, self.get_path(etag, format))
+        except OSError:
+            self.log.exception('Failed to store identicon %s', etag)
+
+    def clear(self):
+        self.cache.clear()
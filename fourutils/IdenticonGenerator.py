@@ -1,6 +1,24 @@
 from dataclasses import dataclass
+from io import BytesIO
 from math import floor, ceil
 from colorsys import hls_to_rgb
+from string import hexdigits
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+else:
+    # Indexed by ASCII code, even hex digits are filled.
+    HEX_DIGITS = np.zeros(256, dtype=bool)
+    HEX_DIGITS[np.frombuffer(b'0123456789abcdefABCDEF', dtype=np.uint8)] = True
+    EVEN_HEX_DIGITS = np.zeros(256, dtype=bool)
+    EVEN_HEX_DIGITS[np.frombuffer(b'02468aceACE', dtype=np.uint8)] = True
 
 
 @dataclass
@@ -22,6 +40,12 @@ class IdenticonGenerator(object):
         self.saturation = saturation
         self.lightness = lightness
         self.inverted = inverted
+
+    @property
+    def settings(self):
+        r"""Everything besides the hash that affects the output."""
+        return (tuple(self.background), self.margin, self.image_size,
+                self.saturation, self.lightness, self.inverted, self.pixels)
     
     def get_hash_color(self, hash):
         hue = int(hash[-7:], 16) / 0xfffffff
@@ -36,16 +60,80 @@ class IdenticonGenerator(object):
         if self.inverted:
             return self.background
         return self.get_hash_color(hash)
+
+    def get_colors(self, hash):
+        r"""The background and foreground colors, computing the hash color
+        once."""
+        color = self.get_hash_color(hash)
+        if self.inverted:
+            return color, self.background
+        return self.background, color
     
+    def get_layout(self):
+        r"""The size of a cell and the offset of the grid, in pixels."""
+        baseMargin = floor(self.image_size * self.margin)
+        cell = floor((self.image_size - (baseMargin * 2)) / self.pixels)
+        margin = floor((self.image_size - cell * self.pixels) / 2)
+        return cell, margin
+
+    def get_grid(self, hash):
+        r"""Which cells are filled, as ``pixels`` rows of booleans."""
+        cols = ceil(self.pixels / 2)
+        self._check_hash(hash, self.pixels * cols)
+        grid = [[False] * self.pixels for _ in range(self.pixels)]
+        for i in range(self.pixels * cols):
+            if int(hash[i], 16) % 2:
+                continue
+            # Mirrored around the center, which the odd case fills once.
+            g, row = divmod(i, self.pixels)
+            grid[row][cols - 1 - g] = True
+            grid[row][self.pixels - cols + g] = True
+        return grid
+
+    def get_grids(self, hashes):
+        r"""Grids for many hashes at once. With NumPy this works on all the
+        hex digits together and returns an ``(n, pixels, pixels)`` boolean
+        array, otherwise a list of :meth:`get_grid` results."""
+        hashes = list(hashes)
+        if np is None:
+            return [self.get_grid(hash) for hash in hashes]
+
+        cols = ceil(self.pixels / 2)
+        count = self.pixels * cols
+        lengths = np.array([len(hash) for hash in hashes], dtype=np.intp)
+        try:
+            chars = np.array(hashes, dtype=bytes)
+        except UnicodeEncodeError:
+            chars = None
+        if chars is not None:
+            width = chars.itemsize
+            chars = chars.view(np.uint8).reshape(len(hashes), width)
+            # The NUL padding past the end of shorter hashes is fine.
+            valid = HEX_DIGITS[chars] | (np.arange(width) >= lengths[:, None])
+        if chars is None or (lengths < count).any() or not valid.all():
+            # Find the culprit the slow way, for the error message.
+            for hash in hashes:
+                self._check_hash(hash, count)
+        filled = EVEN_HEX_DIGITS[chars[:, :count]]
+
+        g, rows = np.divmod(np.arange(count), self.pixels)
+        grids = np.zeros((len(hashes), self.pixels, self.pixels), dtype=bool)
+        grids[:, rows, cols - 1 - g] = filled
+        grids[:, rows, self.pixels - cols + g] = filled
+        return grids
+
+    @staticmethod
+    def _check_hash(hash, count):
+        if len(hash) < count:
+            raise ValueError(f'{hash!r} is too short, {count} hex digits are needed')
+        if not all(c in hexdigits for c in hash):
+            raise ValueError(f'{hash!r} is not a hex digest')
+
     def get_rectangles(self, hash):
         cols = ceil(self.pixels / 2)
 
         rectangles = []
-        baseMargin = floor(self.image_size * self.margin)
-        cell = floor((self.image_size - (baseMargin * 2)) / self.pixels)
-        margin = floor((self.image_size - cell * self.pixels) / 2)
-        background_str = self.get_rgba_string(*self.get_background(hash))
-        foreground_str = self.get_rgba_string(*self.get_foreground(hash))
+        cell, margin = self.get_layout()
 
         for i in range(self.pixels * cols):
             if int(hash[i], 16) % 2:
@@ -80,25 +168,82 @@ class IdenticonGenerator(object):
             
         return rectangles
 
-    def dump(self, hash):
+    def get_cell_markup(self):
+        r"""``(row, column, markup)`` for every cell :meth:`get_grid` reads,
+        in the order :meth:`get_rectangles` draws them, the markup holding
+        the cell and its mirror image."""
+        key = (self.image_size, self.margin, self.pixels)
+        if getattr(self, '_cell_markup', (None,))[0] != key:
+            cols = ceil(self.pixels / 2)
+            # A hash of even digits fills every cell.
+            rectangles = iter(self.get_rectangles('0' * self.pixels * cols))
+            cells = []
+            for i in range(self.pixels * cols):
+                g, row = divmod(i, self.pixels)
+                center = g == 0 and self.pixels % 2
+                rects = [next(rectangles)] if center else \
+                    [next(rectangles), next(rectangles)]
+                cells.append((row, cols - 1 - g, ''.join(
+                    f"<rect x='{rect.x}' y='{rect.y}'"
+                    f" width='{rect.width}' height='{rect.height}'/>"
+                    for rect in rects)))
+            self._cell_markup = (key, cells)
+        return self._cell_markup[1]
+
+    def dump(self, hash, grid=None):
+        r"""Render to an SVG string. ``grid`` can be passed in from
+        :meth:`get_grids`."""
         stroke = self.image_size * 0.005
+        if grid is None:
+            grid = self.get_grid(hash)
+        elif np is not None and isinstance(grid, np.ndarray):
+            grid = grid.tolist()
+
+        background, foreground = self.get_colors(hash)
+        background_str = self.get_rgba_string(*background)
+        foreground_str = self.get_rgba_string(*foreground)
+
+        parts = [f"<svg xmlns='http://www.w3.org/2000/svg'"
+                 f" width='{self.image_size}' height='{self.image_size}'"
+                 f" style='background-color: {background_str}'>"
+                 f"<g style='fill: {foreground_str}; stroke: {foreground_str}; stroke-width: {stroke};'>"]
+        parts.extend(markup for row, col, markup in self.get_cell_markup()
+                     if grid[row][col])
+        parts.append("</g></svg>")
+
+        return ''.join(parts)
+
+    def dump_raster(self, hash, grid=None):
+        r"""Render to a Pillow image, drawing the grid at one pixel per cell
+        and scaling it up with nearest neighbour resampling. ``grid`` can be
+        passed in from :meth:`get_grids`."""
+        if Image is None:
+            raise RuntimeError('Raster identicons require Pillow')
+
+        background, foreground = self.get_colors(hash)
+        background = self.get_rgba_bytes(*background)
+        foreground = self.get_rgba_bytes(*foreground)
+        cell, margin = self.get_layout()
+
+        grid = Image.frombytes('RGBA', (self.pixels, self.pixels), b''.join(
+            foreground if filled else background
+            for row in (self.get_grid(hash) if grid is None else grid)
+            for filled in row))
+        image = Image.new('RGBA', (self.image_size, self.image_size),
+                          tuple(background))
+        image.paste(grid.resize((cell * self.pixels, cell * self.pixels),
+                                Image.NEAREST), (margin, margin))
+        return image
+
+    def dump_png(self, hash, grid=None):
+        buf = BytesIO()
+        self.dump_raster(hash, grid).save(buf, format='PNG')
+        return buf.getvalue()
+
+    @classmethod
+    def get_rgba_bytes(cls, red, green, blue, alpha=1.0):
+        return bytes((round(red), round(green), round(blue), round(alpha * 255)))
 
-        background_str = self.get_rgba_string(*self.get_background(hash))
-        foreground_str = self.get_rgba_string(*self.get_foreground(hash))
-
-        xml = (f"<svg xmlns='http://www.w3.org/2000/svg'"
-                   f" width='{self.image_size}' height='{self.image_size}'"
-                   f" style='background-color: {background_str}'>"
-               f"<g style='fill: {foreground_str}; stroke: {foreground_str}; stroke-width: {stroke};'>")
-        for rect in self.get_rectangles(hash):
-            xml += (f"<rect x='{rect.x}'"
-                         f" y='{rect.y}'"
-                         f" width='{rect.width}'"
-                         f" height='{rect.height}'/>")
-        xml += "</g></svg>"
-
-        return xml
-    
     @classmethod
     def get_rgba_string(cls, red, green, blue, alpha=1.0):
         return f"rgba({round(red)}, {round(green)}, {round(blue)}, {alpha})"
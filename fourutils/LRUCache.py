@@ -0,0 +1,66 @@
+from collections import OrderedDict
+from threading import RLock
+
+
+class LRUCache(object):
+    r"""A small thread-safe, size bounded LRU mapping that keeps track of
+    hits, misses and evictions."""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        with self.lock:
+            try:
+                value = self.data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self.data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self.lock:
+            return self.data.pop(key, default)
+
+    def invalidate(self, key):
+        r"""Drop a stale entry that was just returned by :meth:`get`,
+        counting that lookup as a miss instead of a hit."""
+        with self.lock:
+            if self.data.pop(key, None) is not None:
+                self.hits -= 1
+                self.misses += 1
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    @property
+    def stats(self):
+        return {
+            'size': len(self.data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
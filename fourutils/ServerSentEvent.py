@@ -1,25 +1,78 @@
 import json
+import re
+
+# The spec allows any of these as a line ending, str.splitlines allows more.
+LINE_ENDINGS = re.compile(r'\r\n|\r|\n')
 
 
 class ServerSentEvent(object):
+    r"""A single server-sent event.
+
+    The wire format is built once and cached until a field changes, so an
+    event broadcast to many clients is only encoded once. Multi-line data is
+    split over several ``data:`` lines, and an event with only a ``comment``
+    works as a heartbeat."""
 
-    def __init__(self, data):
+    def __init__(self, data=None, event=None, id=None, retry=None,
+                 comment=None):
+        if isinstance(data, (dict, list)):
+            data = json.dumps(data)
         self.data = data
-        if isinstance(self.data, (dict, list)):
-            self.data = json.dumps(self.data)
-        self.event = None
-        self.id = None
-        self.desc_map = {
+        self.event = event
+        self.id = id
+        self.retry = retry
+        self.comment = comment
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name != '_wire':
+            object.__setattr__(self, '_wire', None)
+
+    @classmethod
+    def heartbeat(cls, comment=''):
+        return cls(comment=comment)
+
+    @classmethod
+    def encode_many(cls, events):
+        r"""Concatenate ``events`` into one buffer for a single write."""
+        return b''.join(event.to_bytes() for event in events)
+
+    @property
+    def desc_map(self):
+        return {
             'data': self.data,
             'event': self.event,
             'id': self.id
         }
 
+    def to_bytes(self):
+        if self._wire is None:
+            self._wire = self.build().encode()
+        return self._wire
+
     def encode(self):
-        if not self.data:
+        return self.to_bytes().decode()
+
+    def build(self):
+        if not self.data and self.comment is None and self.retry is None:
             return ''
 
-        lines = ["%s: %s" % (k, v)
-                 for k, v in self.desc_map.items() if v]
+        lines = []
+        if self.comment is not None:
+            lines.extend(': ' + line if line else ':'
+                         for line in LINE_ENDINGS.split(str(self.comment)))
+        for name in ('event', 'id'):
+            value = getattr(self, name)
+            if value is None:
+                continue
+            value = str(value)
+            if LINE_ENDINGS.search(value) or '\0' in value:
+                raise ValueError(f'Event {name} cannot contain line breaks')
+            lines.append(f'{name}: {value}')
+        if self.retry is not None:
+            lines.append(f'retry: {int(self.retry)}')
+        if self.data:
+            lines.extend('data: ' + line
+                         for line in LINE_ENDINGS.split(str(self.data)))
 
         return "%s\n\n" % "\n".join(lines)
@@ -0,0 +1,260 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from itertools import count
+
+from .LRUCache import LRUCache
+from .ServerSentEvent import ServerSentEvent
+from .log import make_logger
+
+DROP_OLDEST = 'oldest'
+DISCONNECT = 'disconnect'
+HEARTBEAT = ServerSentEvent.heartbeat().to_bytes()
+
+
+class Subscriber(object):
+    r"""A single client's view of a channel.
+
+    Iterate it from a WSGI response generator, or ``async for`` over it from
+    an asyncio handler; both yield encoded events as bytes, and a comment
+    every ``heartbeat`` seconds of silence to keep proxies from timing out."""
+
+    def __init__(self, hub, channel, maxsize, heartbeat):
+        self.hub = hub
+        self.channel = channel
+        self.maxsize = maxsize
+        self.heartbeat = heartbeat
+        self.queue = deque()
+        self.dropped = 0
+        self.closed = False
+        self.cond = threading.Condition()
+        self.loop = None
+        self.ready = None
+
+    def put(self, event):
+        with self.cond:
+            if self.closed:
+                return
+            if len(self.queue) >= self.maxsize:
+                self.dropped += 1
+                if self.hub.drop_policy == DISCONNECT:
+                    # The client reconnects and catches up from the replay
+                    # buffer with Last-Event-ID.
+                    self.closed = True
+                else:
+                    self.queue.popleft()
+            if not self.closed:
+                self.queue.append(event)
+            self.cond.notify()
+        self._wake()
+
+    def _wake(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.ready.set)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        try:
+            self._wake()
+        except RuntimeError:
+            # Its loop is already closed, there's nobody left to wake.
+            pass
+        self.hub.unsubscribe(self)
+
+    def __iter__(self):
+        try:
+            while True:
+                with self.cond:
+                    if not self.queue and not self.closed:
+                        self.cond.wait(self.heartbeat)
+                    event = self.queue.popleft() if self.queue else None
+                    closed = self.closed
+                if event is not None:
+                    yield event.to_bytes()
+                elif closed:
+                    return
+                else:
+                    yield HEARTBEAT
+        finally:
+            self.close()
+
+    async def __aiter__(self):
+        # ready first, _wake only checks loop.
+        self.ready = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+        try:
+            while True:
+                with self.cond:
+                    event = self.queue.popleft() if self.queue else None
+                    closed = self.closed
+                if event is not None:
+                    yield event.to_bytes()
+                    continue
+                if closed:
+                    return
+                self.ready.clear()
+                try:
+                    await asyncio.wait_for(self.ready.wait(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT
+        finally:
+            self.close()
+
+
+class LocalHubBackend(object):
+    r"""Delivers events within this process only."""
+
+    def __init__(self):
+        self.ids = {}
+        self.lock = threading.Lock()
+
+    def start(self, hub):
+        self.hub = hub
+
+    def publish(self, channel, data, event=None):
+        with self.lock:
+            ids = self.ids.setdefault(channel, count(1))
+            event_id = str(next(ids))
+        self.hub.dispatch(channel, ServerSentEvent(data, event=event, id=event_id))
+
+
+class RedisHubBackend(object):
+    r"""Delivers events to every process through redis pub/sub, with one
+    pattern subscription per process regardless of how many clients are
+    connected. Event ids come from a redis counter per channel, so they're
+    consistent across processes for ``Last-Event-ID``. If the connection
+    drops, the listener retries every ``retry_interval`` seconds until it's
+    back, missing whatever was published in between."""
+
+    def __init__(self, redis, prefix='sse:', retry_interval=1):
+        self.redis = redis
+        self.prefix = prefix
+        self.retry_interval = retry_interval
+        self.log = make_logger(__name__)
+
+    def start(self, hub):
+        self.hub = hub
+        self.pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.psubscribe(self.prefix + 'channel:*')
+        self.thread = threading.Thread(target=self._listen,
+                                       name='ServerSentEventHub', daemon=True)
+        self.thread.start()
+
+    def publish(self, channel, data, event=None):
+        if isinstance(data, (dict, list)):
+            data = json.dumps(data)
+        event_id = self.redis.incr(self.prefix + 'id:' + channel)
+        self.redis.publish(self.prefix + 'channel:' + channel, json.dumps({
+            'id': str(event_id), 'event': event, 'data': data}))
+
+    def _listen(self):
+        while True:
+            try:
+                # Reconnects and resubscribes on the first read after a drop.
+                for message in self.pubsub.listen():
+                    self._dispatch(message)
+            except Exception:
+                self.log.exception('Lost redis pub/sub connection, retrying '
+                                   'in %ss', self.retry_interval)
+                time.sleep(self.retry_interval)
+
+    def _dispatch(self, message):
+        if message['type'] != 'pmessage':
+            return
+        offset = len(self.prefix + 'channel:')
+        try:
+            channel = message['channel']
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            payload = json.loads(message['data'])
+            self.hub.dispatch(channel[offset:], ServerSentEvent(
+                payload['data'], event=payload['event'], id=payload['id']))
+        except Exception:
+            self.log.exception('Failed to dispatch event from redis')
+
+
+class ServerSentEventHub(object):
+    r"""Fans events out to subscribers of named channels.
+
+    Each subscriber gets a queue of at most ``maxsize`` events. When a slow
+    client falls behind, ``drop_policy`` either drops its oldest queued event
+    (``'oldest'``) or disconnects it (``'disconnect'``). The last
+    ``replay_size`` events of the ``replay_channels`` most recently used
+    channels are kept so reconnecting clients can resume from their
+    ``Last-Event-ID``. Use a :class:`RedisHubBackend` to share channels
+    between processes.
+
+        hub = ServerSentEventHub()
+
+        @app.route('/events')
+        def events():
+            sub = hub.subscribe('news', request.headers.get('Last-Event-ID'))
+            return Response(sub, mimetype='text/event-stream')
+
+        hub.publish('news', {'headline': '...'})"""
+
+    def __init__(self, backend=None, maxsize=100, replay_size=100,
+                 drop_policy=DROP_OLDEST, heartbeat=15, replay_channels=10000):
+        if drop_policy not in (DROP_OLDEST, DISCONNECT):
+            raise ValueError(f'Unknown drop policy {drop_policy!r}')
+        self.maxsize = maxsize
+        self.replay_size = replay_size
+        self.drop_policy = drop_policy
+        self.heartbeat = heartbeat
+        self.channels = {}
+        self.replay = LRUCache(replay_channels)
+        self.lock = threading.Lock()
+        self.log = make_logger(__name__)
+        self.backend = backend or LocalHubBackend()
+        self.backend.start(self)
+
+    def publish(self, channel, data, event=None):
+        self.backend.publish(channel, data, event=event)
+
+    def subscribe(self, channel, last_event_id=None):
+        subscriber = Subscriber(self, channel, self.maxsize, self.heartbeat)
+        with self.lock:
+            self.channels.setdefault(channel, set()).add(subscriber)
+            # Under the lock so nothing newer is dispatched in between.
+            for event in self.get_missed(channel, last_event_id):
+                subscriber.put(event)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            subscribers = self.channels.get(subscriber.channel)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self.channels[subscriber.channel]
+
+    def get_missed(self, channel, last_event_id):
+        if last_event_id is None:
+            return []
+        events = list(self.replay.get(channel, ()))
+        for i, event in enumerate(events):
+            if event.id == str(last_event_id):
+                return events[i + 1:]
+        # Too old to resume from, send everything we still have.
+        return events
+
+    def dispatch(self, channel, event):
+        with self.lock:
+            replay = self.replay.get(channel)
+            if replay is None:
+                replay = deque(maxlen=self.replay_size)
+                self.replay.set(channel, replay)
+            replay.append(event)
+            subscribers = list(self.channels.get(channel, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put(event)
+            except Exception:
+                # e.g. an async subscriber whose loop has closed.
+                self.log.exception('Failed to deliver event to %s, closing it',
+                                   channel)
+                subscriber.close()
@@ -1,9 +1,16 @@
 from .log import make_logger
 from .ServerSentEvent import ServerSentEvent
+from .ServerSentEventHub import ServerSentEventHub
 from .FilterParser import FilterParser
-from .base36 import base36encode, base36decode
+from .base36 import base36encode, base36decode, SortableIdGenerator
 from .IdenticonGenerator import IdenticonGenerator
+from .IdenticonCache import IdenticonCache
+from .IdenticonBatch import IdenticonBatch
+from .LRUCache import LRUCache
+from .HashRing import HashRing
 
 
-__all__ = ['ServerSentEvent', 'FilterParser', 'base36encode',
-           'base36decode', 'IdenticonGenerator']
+__all__ = ['ServerSentEvent', 'ServerSentEventHub', 'FilterParser',
+           'base36encode', 'base36decode', 'IdenticonGenerator',
+           'IdenticonCache', 'IdenticonBatch', 'LRUCache', 'HashRing',
+           'SortableIdGenerator']
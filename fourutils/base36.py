@@ -1,5 +1,61 @@
-def base36encode(number, alphabet='0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'):
-    """Converts an integer to a base36 string."""
+import os
+import socket
+import time
+from datetime import datetime, timezone
+from hashlib import md5
+from itertools import count
+from random import getrandbits
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+BASE36 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+BASE62 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+# Crockford's base32, which leaves out I, L, O and U.
+CROCKFORD = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+CROCKFORD_ALIASES = {'I': '1', 'L': '1', 'O': '0'}
+
+_decode_tables = {}
+_numpy_tables = {}
+
+
+def _decode_table(alphabet):
+    table = _decode_tables.get(alphabet)
+    if table is None:
+        if len(alphabet) < 2 or len(set(alphabet)) != len(alphabet):
+            raise ValueError('alphabet must have at least two unique characters')
+        table = {c: i for i, c in enumerate(alphabet)}
+        if alphabet == CROCKFORD:
+            for alias, c in CROCKFORD_ALIASES.items():
+                table[alias] = table[c]
+        # Single case alphabets decode either case, like int(x, 36) does.
+        if alphabet.upper() == alphabet or alphabet.lower() == alphabet:
+            for c, i in list(table.items()):
+                table.setdefault(c.lower(), i)
+                table.setdefault(c.upper(), i)
+        _decode_tables[alphabet] = table
+    return table
+
+
+def _numpy_tables_for(alphabet):
+    tables = _numpy_tables.get(alphabet)
+    if tables is None:
+        if not alphabet.isascii():
+            return None
+        decode = np.full(256, -1, dtype=np.int16)
+        for c, i in _decode_table(alphabet).items():
+            if c.isascii():
+                decode[ord(c)] = i
+        encode = np.frombuffer(alphabet.encode('ascii'), dtype=np.uint8)
+        tables = _numpy_tables[alphabet] = (encode, decode)
+    return tables
+
+
+def base36encode(number, alphabet=BASE36, width=0):
+    """Converts an integer to a base36 string, left padded with the zero
+    digit of ``alphabet`` to at least ``width`` digits."""
     if not isinstance(number, int):
         raise TypeError('number must be an integer')
 
@@ -11,14 +67,210 @@ def base36encode(number, alphabet='0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'):
         number = -number
 
     if 0 <= number < len(alphabet):
-        return sign + alphabet[number]
+        return sign + alphabet[number].rjust(width, alphabet[0])
 
     while number != 0:
         number, i = divmod(number, len(alphabet))
         base36 = alphabet[i] + base36
 
-    return sign + base36
+    return sign + base36.rjust(width, alphabet[0])
+
+
+def base36decode(number, alphabet=BASE36):
+    """Converts a string in ``alphabet`` back to an integer. The default
+    alphabet goes through ``int(number, 36)`` as it always has, so it also
+    takes surrounding whitespace, a ``+`` and underscores; other alphabets
+    only take their digits and an optional leading ``-``."""
+    if alphabet == BASE36:
+        return int(number, 36)
+    return _decode(number, alphabet)
+
+
+def _decode(number, alphabet):
+    table = _decode_table(alphabet)
+    base = len(alphabet)
+    sign = 1
+    if number.startswith('-'):
+        sign = -1
+        number = number[1:]
+    if not number:
+        raise ValueError('Empty number')
+
+    value = 0
+    for c in number:
+        try:
+            value = value * base + table[c]
+        except KeyError:
+            raise ValueError(f'Invalid digit {c!r} for this alphabet') from None
+    return sign * value
+
+
+def encode_many(numbers, alphabet=BASE36, width=None):
+    """Encode a sequence, NumPy array or int64 buffer of integers at once.
+
+    With a ``width`` every result is zero padded to the same length, which
+    is ``width`` or that of the longest number if it's longer, so ``0`` pads
+    to the longest. Uses NumPy when it's installed and falls back to
+    :func:`base36encode` otherwise."""
+    tables = _numpy_tables_for(alphabet) if np is not None else None
+    if tables is None:
+        numbers = [base36encode(int(n), alphabet) for n in numbers]
+        if width is None:
+            return numbers
+        width = max([width] + [len(n.lstrip('-')) for n in numbers])
+        return [n[0] + n[1:].rjust(width, alphabet[0]) if n[0] == '-'
+                else n.rjust(width, alphabet[0]) for n in numbers]
+
+    if isinstance(numbers, (bytes, bytearray)):
+        numbers = np.frombuffer(numbers, dtype=np.int64)
+    numbers = np.asarray(numbers, dtype=np.int64).ravel()
+    encode, _ = tables
+    base = np.uint64(len(alphabet))
+
+    negative = numbers < 0
+    # Through uint64 so the magnitude of the int64 minimum doesn't overflow.
+    remaining = np.abs(numbers).astype(np.uint64)
+    columns = []
+    while not columns or remaining.any() or len(columns) < (width or 0):
+        columns.append(remaining % base)
+        remaining //= base
+    digits = np.stack(columns[::-1], axis=1).astype(np.intp)
+    rows, cols = digits.shape
+
+    raw = encode[digits].tobytes().decode('ascii')
+    result = [raw[i:i + cols] for i in range(0, rows * cols, cols)]
+    if width is None:
+        zero = alphabet[0]
+        result = [s.lstrip(zero) or zero for s in result]
+    if negative.any():
+        for i in np.flatnonzero(negative).tolist():
+            result[i] = '-' + result[i]
+    return result
+
+
+def decode_many(numbers, alphabet=BASE36):
+    """Decode a sequence of strings at once, returning an int64 NumPy array,
+    or a list of ints when NumPy isn't installed. Only digits of
+    ``alphabet`` and a leading ``-`` are accepted, whatever the alphabet, and
+    numbers outside the int64 range raise ``OverflowError`` either way."""
+    tables = _numpy_tables_for(alphabet) if np is not None else None
+    if tables is None:
+        values = [_decode(n, alphabet) for n in numbers]
+        if any(not -2 ** 63 <= value < 2 ** 63 for value in values):
+            raise OverflowError('number is out of int64 range')
+        return values
+
+    _, decode = tables
+    base = len(alphabet)
+    # Fixed width byte strings, shorter ones are padded with NULs.
+    numbers = list(numbers)
+    chars = np.array(numbers, dtype=np.bytes_)
+    if chars.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    chars = chars.view(np.uint8).reshape(len(chars), -1)
+
+    negative = chars[:, 0] == ord('-')
+    digits = decode[chars]
+    present = chars != 0
+    present[:, 0] &= ~negative
+    if (present.sum(axis=1) == 0).any():
+        raise ValueError('Empty number')
+    invalid = present & (digits < 0)
+    if invalid.any():
+        row = int(np.flatnonzero(invalid.any(axis=1))[0])
+        raise ValueError(f'Invalid digit in {numbers[row]!r} for this alphabet')
+
+    limit = np.uint64(2 ** 63)
+    value = np.zeros(len(chars), dtype=np.uint64)
+    for col in range(chars.shape[1]):
+        mask = present[:, col]
+        digit = np.where(mask, digits[:, col], 0).astype(np.uint64)
+        if (mask & (value > (limit - digit) // np.uint64(base))).any():
+            raise OverflowError('number is out of int64 range')
+        value = np.where(mask, value * np.uint64(base) + digit, value)
+    if ((value == limit) & ~negative).any():
+        raise OverflowError('number is out of int64 range')
+
+    # Wraps 2 ** 63 around to the int64 minimum, which is what we want.
+    value = value.view(np.int64)
+    return np.where(negative, -value, value)
+
+
+class SortableIdGenerator(object):
+    r"""Generates short, roughly time ordered ids without a database round
+    trip or any coordination between processes.
+
+    Each id is the milliseconds since ``epoch`` and a node id, followed by a
+    per-process counter and random bits, each part encoded at a fixed width,
+    so ids sort by creation time as strings given an alphabet in ascending
+    order like the default :data:`BASE62`. The counter is an
+    ``itertools.count``, which is atomic under the GIL, so generating doesn't
+    take a lock, and the encoded time part is reused within a millisecond.
+    Without an explicit ``node_id`` one is derived from the host name and
+    pid, and is rederived along with the counter after a fork. That fork
+    hook keeps every generator alive for the life of the process, so create
+    one at module level and share it rather than one per use.
+
+        ids = SortableIdGenerator()
+        ids.generate()  # '01FtKV0xu1kdHLbm2'"""
+
+    TIMESTAMP_BITS = 44
+    NODE_BITS = 12
+    COUNTER_BITS = 20
+    RANDOM_BITS = 20
+    # 2020-01-01 UTC, in milliseconds.
+    EPOCH = 1577836800000
+
+    def __init__(self, node_id=None, alphabet=BASE62, epoch=EPOCH):
+        if node_id is not None and not 0 <= node_id < 1 << self.NODE_BITS:
+            raise ValueError(f'node_id must fit in {self.NODE_BITS} bits')
+        self.alphabet = alphabet
+        self.epoch = epoch
+        self.fixed_node_id = node_id
+        self.prefix_width = len(base36encode(
+            (1 << self.TIMESTAMP_BITS + self.NODE_BITS) - 1, alphabet))
+        self.suffix_width = len(base36encode(
+            (1 << self.COUNTER_BITS + self.RANDOM_BITS) - 1, alphabet))
+        self.width = self.prefix_width + self.suffix_width
+        # Every two digit combination, to encode two digits per divmod.
+        self.pairs = [a + b for a in alphabet for b in alphabet]
+        self.reset()
+        if hasattr(os, 'register_at_fork'):
+            # Forked workers would otherwise share the node id and counter.
+            os.register_at_fork(after_in_child=self.reset)
+
+    def reset(self):
+        node_id = self.fixed_node_id
+        if node_id is None:
+            digest = md5(f'{socket.gethostname()}:{os.getpid()}'.encode()).digest()
+            node_id = int.from_bytes(digest[:4], 'big') & ((1 << self.NODE_BITS) - 1)
+        self.node_id = node_id
+        self.counter = count(getrandbits(self.COUNTER_BITS))
+        self.prefix = (None, '')
+
+    def encode(self, value, width):
+        digits = []
+        for _ in range(width // 2):
+            value, i = divmod(value, len(self.pairs))
+            digits.append(self.pairs[i])
+        if width % 2:
+            digits.append(self.alphabet[value])
+        return ''.join(reversed(digits))
 
+    def generate(self):
+        timestamp = time.time_ns() // 1000000
+        prefix = self.prefix
+        if prefix[0] != timestamp:
+            # Racing threads just encode the same prefix twice.
+            prefix = self.prefix = (timestamp, self.encode(
+                (timestamp - self.epoch) << self.NODE_BITS | self.node_id,
+                self.prefix_width))
+        suffix = (next(self.counter) & ((1 << self.COUNTER_BITS) - 1)) << self.RANDOM_BITS
+        return prefix[1] + self.encode(suffix | getrandbits(self.RANDOM_BITS),
+                                       self.suffix_width)
 
-def base36decode(number):
-    return int(number, 36)
\ No newline at end of file
+    def get_datetime(self, id):
+        r"""When ``id`` was generated, as an aware UTC datetime."""
+        prefix = base36decode(id[:self.prefix_width], self.alphabet)
+        timestamp = (prefix >> self.NODE_BITS) + self.epoch
+        return datetime.fromtimestamp(timestamp / 1000, timezone.utc)
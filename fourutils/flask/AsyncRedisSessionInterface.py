@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+from quart.sessions import SessionInterface
+from redis.asyncio import ConnectionPool, Redis
+
+from ..log import make_logger
+from .RedisSessionInterface import RedisSessionBase
+
+
+class AsyncRedisSessionInterface(RedisSessionBase, SessionInterface):
+    r"""An asyncio counterpart to :class:`RedisSessionInterface` for Quart,
+    using the same key layout, serializer and expiry logic so both can share
+    a redis.
+
+    All requests share one connection pool, created from ``url`` unless a
+    client is passed in. Sessions are loaded eagerly with a single pipelined
+    round trip, are only written back when modified, and unmodified ones have
+    their expiry bumped at most once every ``refresh_interval``."""
+
+    def __init__(self, redis=None, prefix='session:', url='redis://localhost',
+                 max_connections=None, refresh_interval=timedelta(minutes=5),
+                 cache_size=None):
+        self.log = make_logger(__name__)
+        if redis is None:
+            pool = ConnectionPool.from_url(url, max_connections=max_connections)
+            redis = Redis(connection_pool=pool)
+            self.log.debug('Created new redis pool %s', pool)
+        super().__init__(redis, prefix=prefix,
+                         refresh_interval=refresh_interval,
+                         cache_size=cache_size)
+
+    async def load_session_data(self, sid):
+        key = self.prefix + sid
+        cached = None if self.cache is None else self.cache.get(sid)
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            self.queue_load(pipe, sid, cached, ttl=True)
+            val, version, ttl = self.unpack_load(await pipe.execute(), cached,
+                                                 ttl=True)
+
+        if cached is not None:
+            if self.is_fresh(cached, version):
+                return cached[1], ttl
+            # Someone else wrote the session since we cached it.
+            self.cache.invalidate(sid)
+            val = await self.redis.get(key)
+
+        if val is None:
+            return None, None
+        data = self.decode_session_data(sid, val)
+        if data is None:
+            return None, None
+        if self.needs_migration(val):
+            # Rewrite in the current format, leaving the expiry alone.
+            await self.redis.set(key, self.serializer.dumps(data),
+                                 xx=True, keepttl=True)
+        self.cache_session_data(sid, version, data)
+        return data, ttl
+
+    async def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if not sid:
+            return self.session_class(sid=self.generate_sid(), new=True)
+        data, ttl = await self.load_session_data(sid)
+        if data is None:
+            return self.session_class(sid=sid, new=True)
+        session = self.session_class(data, sid=sid)
+        session.ttl = ttl
+        return session
+
+    async def save_session(self, app, session, response):
+        cookie_name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        if not session:
+            if not session.new:
+                self.log.debug('Deleting existing session %s', session.sid)
+                await self.delete_session_data(session.sid)
+            if session.modified and response is not None:
+                response.delete_cookie(cookie_name, domain=domain)
+            return
+        redis_exp = self.get_redis_expiration_time(app, session)
+        cookie_exp = self.get_expiration_time(app, session)
+
+        if not session.modified:
+            if self.should_refresh(session, redis_exp):
+                await self.refresh_session_data(session.sid, redis_exp)
+            if not self.should_set_cookie(app, session):
+                return
+        else:
+            await self.write_session_data(session.sid, dict(session),
+                                          redis_exp)
+
+        if response is not None:
+            response.set_cookie(cookie_name, session.sid,
+                                expires=cookie_exp, httponly=True,
+                                domain=domain)
+
+    async def write_session_data(self, sid, data, redis_exp):
+        time = int(redis_exp.total_seconds())
+        version = self.generate_version()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.setex(name=self.prefix + sid,
+                       value=self.serializer.dumps(data), time=time)
+            if version is not None:
+                pipe.setex(name=self.get_version_key(sid), value=version,
+                           time=time)
+            await pipe.execute()
+        self.cache_session_data(sid, version, data)
+
+    async def refresh_session_data(self, sid, redis_exp):
+        time = int(redis_exp.total_seconds())
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.expire(self.prefix + sid, time)
+            if self.cache is not None:
+                pipe.expire(self.get_version_key(sid), time)
+            await pipe.execute()
+
+    async def delete_session_data(self, sid):
+        await self.redis.delete(self.prefix + sid, self.get_version_key(sid))
+        if self.cache is not None:
+            self.cache.pop(sid)
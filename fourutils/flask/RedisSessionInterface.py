@@ -1,5 +1,7 @@
 import pickle
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from time import monotonic
 from uuid import uuid4
 
 from flask.sessions import SessionInterface, SessionMixin
@@ -7,30 +9,81 @@ from redis import Redis
 from werkzeug.datastructures import CallbackDict
 
 from ..log import make_logger
+from ..LRUCache import LRUCache
 
 
 class RedisSession(CallbackDict, SessionMixin):
+    r"""A session dict backed by redis.
 
-    def __init__(self, initial=None, sid=None, new=False):
+    If a ``loader`` is given the stored payload isn't fetched until the
+    session is first accessed, ``loader(sid)`` must return a tuple of
+    ``(data, ttl)`` where ``data`` is ``None`` if nothing was stored."""
+
+    def __init__(self, initial=None, sid=None, new=False, loader=None):
         def on_update(self):
             self.modified = True
         CallbackDict.__init__(self, initial, on_update)
         self.sid = sid
         self.new = new
         self.modified = False
+        self.loader = loader
+        self.loaded = loader is None
+        self.ttl = None
+
+    def load(self):
+        if self.loaded:
+            return
+        # Flag first, the loader may touch the session itself.
+        self.loaded = True
+        data, self.ttl = self.loader(self.sid)
+        if data is None:
+            self.new = True
+        else:
+            # Bypass CallbackDict so loading doesn't count as a change.
+            dict.update(self, data)
+
+
+def _load_first(name):
+    method = getattr(CallbackDict, name)
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.load()
+        return method(self, *args, **kwargs)
+    return wrapper
+
 
+# Every read and write needs the payload to be there first, writes included
+# so a late load can't clobber them.
+for _name in ('__getitem__', '__contains__', '__iter__', '__len__',
+              '__repr__', '__eq__', '__ne__', 'get', 'keys', 'values',
+              'items', 'copy', '__setitem__', '__delitem__', 'clear', 'pop',
+              'popitem', 'setdefault', 'update'):
+    setattr(RedisSession, _name, _load_first(_name))
+del _name
+
+
+class RedisSessionBase(object):
+    r"""Redis key layout, expiry and caching logic shared by the sync and
+    async session interfaces, so apps can move between them freely.
+
+    Setting ``cache_size`` keeps up to that many decoded sessions in an
+    in-process LRU. Every write also stores a random version token next to
+    the payload, so a cached copy only costs a GET of that token to validate.
+    All workers sharing a redis should agree on whether the cache is enabled,
+    as writes without it don't update the version token. Nested values are
+    shared with the cached copy, so mutate them in place only if you also
+    set ``session.modified``."""
 
-class RedisSessionInterface(SessionInterface):
     serializer = pickle
     session_class = RedisSession
 
-    def __init__(self, redis=None, prefix='session:'):
-        self.log = make_logger(__name__)
-        if redis is None:
-            redis = Redis()
-            self.log.debug('Created new redis session %s', redis)
+    def __init__(self, redis, prefix='session:',
+                 refresh_interval=timedelta(minutes=5), cache_size=None):
         self.redis = redis
         self.prefix = prefix
+        self.refresh_interval = refresh_interval
+        self.cache = LRUCache(cache_size) if cache_size else None
 
     def generate_sid(self):
         return str(uuid4())
@@ -40,31 +93,160 @@ class RedisSessionInterface(SessionInterface):
             return app.permanent_session_lifetime
         return timedelta(days=1)
 
+    def get_redis(self, sid):
+        return self.redis
+
+    def get_version_key(self, sid):
+        return self.prefix + sid + ':version'
+
+    def generate_version(self):
+        if self.cache is None:
+            return None
+        return uuid4().hex.encode()
+
+    def should_refresh(self, session, redis_exp):
+        if session.ttl is None or session.ttl < 0:
+            return True
+        elapsed = redis_exp.total_seconds() - session.ttl
+        return elapsed >= self.refresh_interval.total_seconds()
+
+    def queue_load(self, pipe, sid, cached, ttl):
+        key = self.prefix + sid
+        if cached is None:
+            pipe.get(key)
+        if self.cache is not None:
+            pipe.get(self.get_version_key(sid))
+        if ttl:
+            pipe.ttl(key)
+
+    def unpack_load(self, results, cached, ttl):
+        r"""Split the results of :meth:`queue_load` into a tuple of
+        ``(val, version, ttl)``."""
+        results = iter(results)
+        val = next(results) if cached is None else None
+        version = next(results) if self.cache is not None else None
+        if isinstance(version, str):
+            version = version.encode()
+        return val, version, next(results) if ttl else None
+
+    def is_fresh(self, cached, version):
+        return version is not None and version == cached[0]
+
+    def decode_session_data(self, sid, val):
+        try:
+            return self.serializer.loads(val)
+        except:
+            self.log.exception('Failed to deserialize session data \
+                                for %s, opening new session.', sid)
+            return None
+
+    def needs_migration(self, val):
+        migrate = getattr(self.serializer, 'needs_migration', None)
+        return migrate is not None and migrate(val)
+
+    def cache_session_data(self, sid, version, data):
+        if self.cache is not None and version is not None:
+            self.cache.set(sid, (version, data))
+
+
+class RedisSessionInterface(RedisSessionBase, SessionInterface):
+    r"""Stores sessions in redis under ``prefix + sid``.
+
+    With ``lazy`` enabled sessions are only fetched from redis when a view
+    actually touches them and are only written back when modified. Unmodified
+    sessions have their expiry bumped at most once every
+    ``refresh_interval``, including ones the view never touched: each process
+    remembers when it last refreshed up to ``refresh_cache_size`` sessions and
+    their expiry, and sends a bare EXPIRE once the interval has passed. An
+    untouched session this process hasn't seen yet is loaded once to learn
+    its expiry. Permanent sessions still get their cookie re-sent on every
+    request when ``SESSION_REFRESH_EACH_REQUEST`` is set, so the browser's
+    expiry slides along with redis'."""
+
+    def __init__(self, redis=None, prefix='session:', lazy=False,
+                 refresh_interval=timedelta(minutes=5), cache_size=None,
+                 refresh_cache_size=10000):
+        self.log = make_logger(__name__)
+        if redis is None:
+            redis = Redis()
+            self.log.debug('Created new redis session %s', redis)
+        super().__init__(redis, prefix=prefix,
+                         refresh_interval=refresh_interval,
+                         cache_size=cache_size)
+        self.lazy = lazy
+        # sid -> (monotonic time of the last refresh, redis expiry, permanent)
+        self.refreshed = LRUCache(refresh_cache_size) if lazy else None
+
+    def load_session_data(self, sid):
+        key = self.prefix + sid
+        cached = None if self.cache is None else self.cache.get(sid)
+
+        redis = self.get_redis(sid)
+        pipe = redis.pipeline(transaction=False)
+        self.queue_load(pipe, sid, cached, ttl=self.lazy)
+        val, version, ttl = self.unpack_load(pipe.execute(), cached,
+                                             ttl=self.lazy)
+
+        if cached is not None:
+            if self.is_fresh(cached, version):
+                return cached[1], ttl
+            # Someone else wrote the session since we cached it.
+            self.cache.invalidate(sid)
+            val = redis.get(key)
+
+        if val is None:
+            return None, None
+        data = self.decode_session_data(sid, val)
+        if data is None:
+            return None, None
+        if self.needs_migration(val):
+            # Rewrite in the current format, leaving the expiry alone.
+            redis.set(key, self.serializer.dumps(data),
+                      xx=True, keepttl=True)
+        self.cache_session_data(sid, version, data)
+        return data, ttl
+
     def open_session(self, app, request):
         sid = request.cookies.get(app.session_cookie_name)
         if not sid:
             sid = self.generate_sid()
             # self.log.debug('Opened new session %s', sid)
             return self.session_class(sid=sid, new=True)
-        val = self.redis.get(self.prefix + sid)
-        if val is not None:
-            try:
-                data = self.serializer.loads(val)
-            except:
-                self.log.exception('Failed to deserialize session data \
-                                    for %s, opening new session.', sid)
-                return self.session_class(sid=sid, new=True)
-            else:
-                # self.log.debug('Opened existing session %s', sid)
-                return self.session_class(data, sid=sid)
+        if self.lazy:
+            return self.session_class(sid=sid, loader=self.load_session_data)
+        data, _ = self.load_session_data(sid)
+        if data is not None:
+            # self.log.debug('Opened existing session %s', sid)
+            return self.session_class(data, sid=sid)
         # self.log.debug('Opened new session %s', sid)
         return self.session_class(sid=sid, new=True)
 
     def save_session(self, app, session, response):
+        if self.lazy and not (session.loaded or session.modified):
+            # Never touched during this request, only the expiry to maintain.
+            refreshed = self.refreshed.get(session.sid)
+            if refreshed is not None:
+                refreshed_at, redis_exp, permanent = refreshed
+                if monotonic() - refreshed_at >= self.refresh_interval.total_seconds():
+                    self.refresh_session_data(session.sid, redis_exp)
+                    self.refreshed.set(session.sid,
+                                       (monotonic(), redis_exp, permanent))
+                # Same as should_set_cookie, without loading the session to
+                # check it's permanent.
+                if permanent and app.config['SESSION_REFRESH_EACH_REQUEST']:
+                    response.set_cookie(
+                        app.session_cookie_name, session.sid,
+                        expires=datetime.now(timezone.utc) + app.permanent_session_lifetime,
+                        httponly=True, domain=self.get_cookie_domain(app))
+                return
+            # Whether it's permanent, and so its expiry, is in the payload.
+            session.load()
+
         domain = self.get_cookie_domain(app)
         if not session:
-            self.log.debug('Deleting existing session %s', session.sid)
-            self.redis.delete(self.prefix + session.sid)
+            if not (self.lazy and session.new):
+                self.log.debug('Deleting existing session %s', session.sid)
+                self.delete_session_data(session.sid)
             if session.modified:
                 response.delete_cookie(app.session_cookie_name,
                                        domain=domain)
@@ -72,12 +254,62 @@ class RedisSessionInterface(SessionInterface):
         redis_exp = self.get_redis_expiration_time(app, session)
         cookie_exp = self.get_expiration_time(app, session)
 
-        key = self.prefix + session.sid
-        val = self.serializer.dumps(dict(session))
-
-        self.redis.setex(name=key, value=val, time=int(redis_exp.total_seconds()))
+        if self.lazy and not session.modified:
+            if self.should_refresh(session, redis_exp):
+                self.refresh_session_data(session.sid, redis_exp)
+                refreshed_at = monotonic()
+            else:
+                refreshed_at = monotonic() - (redis_exp.total_seconds() - session.ttl)
+            self.refreshed.set(session.sid,
+                               (refreshed_at, redis_exp, session.permanent))
+            if not self.should_set_cookie(app, session):
+                return
+        else:
+            self.write_session_data(session.sid, dict(session), redis_exp)
+            if self.lazy:
+                self.refreshed.set(session.sid,
+                                   (monotonic(), redis_exp, session.permanent))
 
         response.set_cookie(app.session_cookie_name, session.sid,
                             expires=cookie_exp, httponly=True,
                             domain=domain)
         # self.log.debug('Saved session %s', session.sid)
+
+    def write_session_data(self, sid, data, redis_exp):
+        key = self.prefix + sid
+        val = self.serializer.dumps(data)
+        time = int(redis_exp.total_seconds())
+        redis = self.get_redis(sid)
+        if self.cache is None:
+            redis.setex(name=key, value=val, time=time)
+            return
+
+        version = self.generate_version()
+        pipe = redis.pipeline(transaction=True)
+        pipe.setex(name=key, value=val, time=time)
+        pipe.setex(name=self.get_version_key(sid), value=version, time=time)
+        pipe.execute()
+        self.cache_session_data(sid, version, data)
+
+    def refresh_session_data(self, sid, redis_exp):
+        time = int(redis_exp.total_seconds())
+        redis = self.get_redis(sid)
+        if self.cache is None:
+            redis.expire(self.prefix + sid, time)
+            return
+
+        pipe = redis.pipeline(transaction=False)
+        pipe.expire(self.prefix + sid, time)
+        pipe.expire(self.get_version_key(sid), time)
+        pipe.execute()
+
+    def delete_session_data(self, sid):
+        if self.refreshed is not None:
+            self.refreshed.pop(sid)
+        redis = self.get_redis(sid)
+        if self.cache is None:
+            redis.delete(self.prefix + sid)
+            return
+
+        redis.delete(self.prefix + sid, self.get_version_key(sid))
+        self.cache.pop(sid)
@@ -0,0 +1,195 @@
+import pickle
+import zlib
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from uuid import UUID
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+Codec = namedtuple('Codec', ('id', 'name', 'dumps', 'loads'))
+Compressor = namedtuple('Compressor', ('id', 'name', 'compress', 'decompress'))
+
+# Header byte layout is 0b01CCCCZZ, the leading 01 is the format version.
+# Pickle (protocol 2+) and msgpack maps both start at 0x80 or above, and
+# pickle protocol 0 at '(' (0x28). Protocol 1 starts at '}' (0x7D), which
+# would read as codec 15, so that id is never registered.
+FORMAT_VERSION = 1
+RESERVED_CODEC_ID = 15
+codecs = {}
+compressors = {}
+
+
+def register_codec(codec_id, name, dumps, loads):
+    if not 0 <= codec_id < RESERVED_CODEC_ID:
+        raise ValueError('codec_id must be between 0 and 14')
+    codecs[name] = codecs[codec_id] = Codec(codec_id, name, dumps, loads)
+
+
+def register_compressor(compressor_id, name, compress, decompress):
+    if not 0 < compressor_id < 4:
+        raise ValueError('compressor_id must be between 1 and 3')
+    compressors[name] = compressors[compressor_id] = \
+        Compressor(compressor_id, name, compress, decompress)
+
+
+register_codec(0, 'pickle', pickle.dumps, pickle.loads)
+register_compressor(1, 'zlib', zlib.compress, zlib.decompress)
+
+if zstandard is not None:
+    register_compressor(
+        2, 'zstd',
+        lambda val: zstandard.ZstdCompressor().compress(val),
+        lambda val: zstandard.ZstdDecompressor().decompress(val))
+
+
+if msgpack is not None:
+    EXT_DATETIME = 1
+    EXT_DATE = 2
+    EXT_TIME = 3
+    EXT_TIMEDELTA = 4
+    EXT_UUID = 5
+    EXT_SET = 6
+    EXT_FROZENSET = 7
+    EXT_TUPLE = 8
+    EXT_DECIMAL = 9
+
+    def _msgpack_default(obj):
+        # Order matters, datetime is a subclass of date.
+        if isinstance(obj, datetime):
+            return msgpack.ExtType(EXT_DATETIME, obj.isoformat().encode())
+        if isinstance(obj, date):
+            return msgpack.ExtType(EXT_DATE, obj.isoformat().encode())
+        if isinstance(obj, time):
+            return msgpack.ExtType(EXT_TIME, obj.isoformat().encode())
+        if isinstance(obj, timedelta):
+            return msgpack.ExtType(EXT_TIMEDELTA, _msgpack_dumps(
+                [obj.days, obj.seconds, obj.microseconds]))
+        if isinstance(obj, UUID):
+            return msgpack.ExtType(EXT_UUID, obj.bytes)
+        if isinstance(obj, frozenset):
+            return msgpack.ExtType(EXT_FROZENSET, _msgpack_dumps(list(obj)))
+        if isinstance(obj, set):
+            return msgpack.ExtType(EXT_SET, _msgpack_dumps(list(obj)))
+        if isinstance(obj, tuple):
+            return msgpack.ExtType(EXT_TUPLE, _msgpack_dumps(list(obj)))
+        if isinstance(obj, Decimal):
+            return msgpack.ExtType(EXT_DECIMAL, str(obj).encode())
+        # strict_types sends subclasses here too (Markup, OrderedDict, ...).
+        for base in (dict, list, str, bytes, int, float):
+            if isinstance(obj, base):
+                return base(obj)
+        raise TypeError(f'Cannot serialize {type(obj).__name__} to msgpack')
+
+    def _msgpack_ext_hook(code, data):
+        if code == EXT_DATETIME:
+            return datetime.fromisoformat(data.decode())
+        if code == EXT_DATE:
+            return date.fromisoformat(data.decode())
+        if code == EXT_TIME:
+            return time.fromisoformat(data.decode())
+        if code == EXT_TIMEDELTA:
+            return timedelta(*_msgpack_loads(data))
+        if code == EXT_UUID:
+            return UUID(bytes=data)
+        if code == EXT_SET:
+            return set(_msgpack_loads(data))
+        if code == EXT_FROZENSET:
+            return frozenset(_msgpack_loads(data))
+        if code == EXT_TUPLE:
+            return tuple(_msgpack_loads(data))
+        if code == EXT_DECIMAL:
+            return Decimal(data.decode())
+        return msgpack.ExtType(code, data)
+
+    def _msgpack_dumps(obj):
+        return msgpack.packb(obj, default=_msgpack_default,
+                             use_bin_type=True, strict_types=True)
+
+    def _msgpack_loads(val):
+        return msgpack.unpackb(val, ext_hook=_msgpack_ext_hook, raw=False)
+
+    register_codec(1, 'msgpack', _msgpack_dumps, _msgpack_loads)
+
+
+class SessionSerializer(object):
+    r"""Serializes session data with a registered codec, prefixed by a
+    single header byte recording the format version, codec and compression.
+
+    Payloads larger than ``compress_threshold`` bytes are compressed.
+    Headers naming a codec other than ``codec`` or one of ``accept`` are
+    rejected, so a msgpack serializer never unpickles. Payloads without a
+    header are handed to each of the ``legacy`` codecs in turn (just
+    ``codec`` by default), so sessions written by a plain pickle or msgpack
+    serializer can still be read, and are rewritten with a header on read.
+
+    With ``header`` off payloads are written bare and uncompressed, which
+    workers still using a plain serializer can read. Roll out with it off,
+    then turn it on once every worker reads headers."""
+
+    def __init__(self, codec='msgpack', compression='zlib',
+                 compress_threshold=1024, legacy=None, accept=(),
+                 header=True):
+        self.codec = codecs[codec]
+        self.compressor = compressors[compression] if compression else None
+        self.compress_threshold = compress_threshold
+        if legacy is None:
+            legacy = (codec,)
+        self.legacy = [codecs[name] for name in legacy if name in codecs]
+        self.accept = {self.codec.id} | {codecs[name].id for name in accept}
+        self.header = header
+
+    def dumps(self, data):
+        val = self.codec.dumps(data)
+        if not self.header:
+            return val
+        compressor_id = 0
+        if self.compressor and len(val) > self.compress_threshold:
+            val = self.compressor.compress(val)
+            compressor_id = self.compressor.id
+        header = FORMAT_VERSION << 6 | self.codec.id << 2 | compressor_id
+        return bytes((header,)) + val
+
+    def has_header(self, val):
+        return bool(val) and val[0] >> 6 == FORMAT_VERSION and \
+            val[0] >> 2 & 0b1111 != RESERVED_CODEC_ID
+
+    def loads(self, val):
+        if not self.has_header(val):
+            return self.loads_legacy(val)
+
+        header = val[0]
+        val = val[1:]
+        codec_id = header >> 2 & 0b1111
+        if codec_id not in self.accept:
+            raise ValueError(f'Session data codec {codec_id} is not accepted')
+        compressor_id = header & 0b11
+        if compressor_id:
+            val = compressors[compressor_id].decompress(val)
+        return codecs[codec_id].loads(val)
+
+    def loads_legacy(self, val):
+        for codec in self.legacy:
+            try:
+                return codec.loads(val)
+            except Exception:
+                continue
+        raise ValueError('Session data is not in a known format')
+
+    def needs_migration(self, val):
+        r"""Whether ``val`` was written without a header or with a different
+        codec than this serializer uses. Never, with ``header`` off."""
+        if not self.header:
+            return False
+        if not self.has_header(val):
+            return True
+        return val[0] >> 2 & 0b1111 != self.codec.id
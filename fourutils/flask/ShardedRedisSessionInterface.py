@@ -0,0 +1,56 @@
+from datetime import timedelta
+from uuid import uuid4
+
+from ..HashRing import HashRing
+from ..LRUCache import LRUCache
+from ..log import make_logger
+from .RedisSessionInterface import RedisSessionBase, RedisSessionInterface
+
+
+class ShardedRedisSessionInterface(RedisSessionInterface):
+    r"""Spreads sessions over several redis nodes.
+
+    ``shards`` maps a short shard name to its redis client. New sids are
+    assigned a shard with consistent hashing and carry its name as a prefix
+    (``<shard>.<uuid>``), so looking a session up is a dict lookup and adding
+    shards never moves existing sessions. Sids without a known hint, such as
+    those issued before sharding was enabled or whose shard was removed, fall
+    back to the hash ring, which only remaps a small fraction of them when
+    nodes change."""
+
+    def __init__(self, shards, prefix='session:', lazy=False,
+                 refresh_interval=timedelta(minutes=5), cache_size=None,
+                 refresh_cache_size=10000, replicas=100):
+        self.log = make_logger(__name__)
+        RedisSessionBase.__init__(self, None, prefix=prefix,
+                                  refresh_interval=refresh_interval,
+                                  cache_size=cache_size)
+        self.lazy = lazy
+        self.refreshed = LRUCache(refresh_cache_size) if lazy else None
+        self.shards = {}
+        self.ring = HashRing(replicas=replicas)
+        for name, redis in shards.items():
+            self.add_shard(name, redis)
+
+    def add_shard(self, name, redis):
+        if not name or '.' in name:
+            raise ValueError('Shard names must be non-empty and not contain "."')
+        self.shards[name] = redis
+        self.ring.add(name)
+
+    def remove_shard(self, name):
+        self.ring.remove(name)
+        return self.shards.pop(name, None)
+
+    def get_shard_name(self, sid):
+        hint, sep, _ = sid.partition('.')
+        if sep and hint in self.shards:
+            return hint
+        return self.ring.get_node(sid)
+
+    def get_redis(self, sid):
+        return self.shards[self.get_shard_name(sid)]
+
+    def generate_sid(self):
+        sid = str(uuid4())
+        return f'{self.ring.get_node(sid)}.{sid}'
@@ -1,7 +1,12 @@
-import msgpack
-
-from . import RedisSessionInterface
+from .RedisSessionInterface import RedisSessionInterface
+from .SessionSerializer import SessionSerializer
 
 
 class MsgpackRedisSessionInterface(RedisSessionInterface):
-    serializer = msgpack
\ No newline at end of file
+    r"""Stores sessions as msgpack, without pickle ever being used to read
+    them. Payloads are written bare so workers on older releases can still
+    read them; once none are left, set ``serializer`` to
+    ``SessionSerializer('msgpack')`` for headers and compression. Sessions
+    are rewritten in the new format as they're read."""
+
+    serializer = SessionSerializer('msgpack', header=False)
@@ -0,0 +1,185 @@
+import asyncio
+from contextlib import asynccontextmanager
+from time import monotonic
+
+from sqlalchemy import select
+from sqlalchemy.exc import ProgrammingError
+
+from .UserConfigManager import UserConfigManager, _MISSING
+
+
+class AsyncUserConfigManager(UserConfigManager):
+    r"""An asyncio counterpart to :class:`UserConfigManager` on top of
+    SQLAlchemy's ``AsyncSession``, with the same defaults, strict and caching
+    behaviour.
+
+    ``session_factory`` is called for a fresh ``AsyncSession`` per operation,
+    usually an ``async_sessionmaker``. Concurrent misses for the same key
+    share a single query. The sync ``version`` counter isn't supported here,
+    use ``ttl`` to bound staleness instead. A fetch that was in flight
+    during a write never caches the value from before it."""
+
+    def __init__(self, session_factory, kv_model, defaults={}, strict=True,
+                 ttl=None):
+        super().__init__(session_factory, kv_model, defaults=defaults,
+                         strict=strict, ttl=ttl)
+        self.session_factory = session_factory
+        # Keys currently being fetched, mapped to a future for that fetch.
+        self.pending = {}
+        # Counts writes, with the count at each key's last write, so fetches
+        # can tell which keys were written while they were in flight.
+        self.writes = 0
+        self.written = {}
+
+    async def fetch(self, keys):
+        while True:
+            self.validate_cache()
+            missing = {key for key in keys if key not in self.cache}
+            if not missing:
+                return
+
+            waiting = {self.pending[key] for key in missing if key in self.pending}
+            to_load = [key for key in missing if key not in self.pending]
+            if to_load:
+                future = asyncio.get_running_loop().create_future()
+                for key in to_load:
+                    self.pending[key] = future
+                try:
+                    await self.load(to_load)
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except BaseException as e:
+                    future.set_exception(e)
+                    # Mark it retrieved, we re-raise it ourselves.
+                    future.exception()
+                    raise
+                else:
+                    future.set_result(None)
+                finally:
+                    for key in to_load:
+                        self.pending.pop(key, None)
+
+            if not waiting:
+                return
+            # Unlike gather, wait doesn't cancel the shared futures if we're
+            # cancelled ourselves.
+            await asyncio.wait(waiting)
+            if not any(f.cancelled() for f in waiting):
+                for f in waiting:
+                    f.result()
+                return
+            # Whoever was loading was cancelled, e.g. its client went away,
+            # so go round again and fetch what's still missing ourselves.
+
+    def mark_written(self, keys):
+        self.writes += 1
+        for key in keys:
+            self.written[key] = self.writes
+
+    def written_since(self, key, writes):
+        return self.written.get(key, 0) > writes
+
+    # Rows for ``keys``, or the whole table, as (key, encoded value) pairs.
+    async def select_rows(self, keys=None):
+        query = select(self.kv_model)
+        if keys is not None:
+            query = query.where(self.kv_model.key.in_(keys))
+        async with self.session_factory() as session:
+            result = await session.execute(query)
+            return [(kv.key, kv.value) for kv in result.scalars()]
+
+    async def load(self, keys):
+        writes = self.writes
+        if not self.preloaded:
+            try:
+                rows = await self.select_rows(keys)
+            except ProgrammingError:
+                return
+            for key, value in rows:
+                if not self.written_since(key, writes):
+                    self.cache[key] = self.decode(value)
+
+        for key in keys:
+            if not self.written_since(key, writes):
+                self.cache.setdefault(key, _MISSING)
+
+    async def get(self, key):
+        key = key.lower()
+        await self.fetch([key])
+        return self.resolve(key)
+
+    async def get_many(self, keys):
+        keys = [key.lower() for key in keys]
+        await self.fetch(keys)
+        return {key: self.resolve(key) for key in keys}
+
+    async def set(self, key, value):
+        key = key.lower()
+        encoded = self.encode(value)
+        async with self.session_factory() as session:
+            async with session.begin():
+                kv = await session.get(self.kv_model, key)
+                if not kv:
+                    kv = self.kv_model(key=key)
+                    session.add(kv)
+                kv.value = encoded
+
+        self.log.debug(f'Wrote db_config key to database: {key}={value}')
+        self.mark_written([key])
+        self.cache[key] = value
+        return encoded
+
+    async def set_many(self, mapping):
+        values = {key.lower(): value for key, value in mapping.items()}
+        if not values:
+            return
+        rows = [{'key': key, 'value': self.encode(value)}
+                for key, value in values.items()]
+        async with self.session_factory() as session:
+            async with session.begin():
+                stmts = self.build_upserts(session.bind.dialect.name, rows)
+                if stmts is None:
+                    for row in rows:
+                        await session.merge(self.kv_model(**row))
+                else:
+                    for stmt in stmts:
+                        await session.execute(stmt)
+
+        self.log.debug(f'Wrote {len(rows)} db_config keys to database.')
+        self.mark_written(values)
+        self.cache.update(values)
+
+    @asynccontextmanager
+    async def batch(self):
+        pending = {}
+        yield pending
+        await self.set_many(pending)
+
+    async def preload(self):
+        writes = self.writes
+        cache = {key: self.decode(value)
+                 for key, value in await self.select_rows()}
+        # Keep what was written while we were reading.
+        for key in self.written:
+            if self.written_since(key, writes) and key in self.cache:
+                cache[key] = self.cache[key]
+        self.cache = cache
+        self.cache_created_at = monotonic()
+        self.preloaded = True
+
+    async def get_all(self):
+        await self.preload()
+        return {
+            **self.defaults,
+            **{k: v for k, v in self.cache.items() if v is not _MISSING}
+        }
+
+    async def reset(self, key):
+        async with self.session_factory() as session:
+            async with session.begin():
+                kv = await session.get(self.kv_model, key)
+                if kv:
+                    await session.delete(kv)
+        self.mark_written([key])
+        self.cache[key] = _MISSING
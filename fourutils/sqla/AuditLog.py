@@ -0,0 +1,214 @@
+import atexit
+import os
+import queue
+import threading
+from datetime import date, datetime
+
+from sqlalchemy import Column, DateTime, Integer, String, Table, event, inspect
+from sqlalchemy.orm import Session
+
+from ..log import make_logger
+from .mixins.audit import AuditMixin, _current_user_id_or_none
+from .types import JSONEncodedDict, LazyJSONValue
+
+
+def _jsonable(value):
+    if isinstance(value, LazyJSONValue):
+        value = value.value
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [_jsonable(v) for v in value]
+    return str(value)
+
+
+class AuditLog(object):
+    r"""Keeps an append-only history of column level changes to audited
+    models, ``AuditMixin`` subclasses by default.
+
+    Changes are captured when a session flushes, queued once its outermost
+    transaction commits and written in batches by a background thread, so requests don't pay for the
+    extra inserts. The queue holds at most ``maxsize`` entries, beyond which
+    entries are dropped (and counted in ``dropped``) unless ``block`` is set.
+    Anything still queued is written on :meth:`close`, which also runs at
+    interpreter exit.
+
+    Values edited in place, such as a ``MutableDict`` column, are logged
+    with an old value of ``None``, since SQLAlchemy doesn't keep a copy of
+    what they were before the edit. Assign a new value instead to have both
+    sides logged."""
+
+    def __init__(self, engine, table, models=(AuditMixin,), maxsize=10000,
+                 batch_size=500, flush_interval=1.0, block=False):
+        self.engine = engine
+        self.table = table
+        self.models = tuple(models)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block = block
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.log = make_logger(__name__)
+
+        self.start()
+        atexit.register(self.close)
+        if hasattr(os, 'register_at_fork'):
+            # Threads don't survive a fork, e.g. gunicorn's --preload.
+            os.register_at_fork(after_in_child=self._restart)
+
+    def _restart(self):
+        # Fork hooks can't be unregistered, so stay closed once closed.
+        if not self._stop.is_set():
+            self.start()
+
+    def start(self):
+        self.queue = queue.Queue(self.maxsize)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='AuditLog',
+                                        daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def make_table(metadata, name='audit_log'):
+        return Table(
+            name, metadata,
+            Column('id', Integer, primary_key=True),
+            Column('table_name', String(128), nullable=False, index=True),
+            Column('row_id', String(128), index=True),
+            Column('action', String(8), nullable=False),
+            Column('changes', JSONEncodedDict),
+            Column('user_id', Integer),
+            Column('created_at', DateTime, nullable=False, default=datetime.now),
+        )
+
+    def register(self, target=Session):
+        r"""Start capturing changes from ``target``, a session, sessionmaker
+        or session class."""
+        event.listen(target, 'after_flush', self.capture)
+        event.listen(target, 'after_commit', self.commit)
+        event.listen(target, 'after_soft_rollback', self.rollback)
+
+    def capture(self, session, flush_context):
+        now = datetime.now()
+        user_id = _current_user_id_or_none()
+        # Remembered with the changes, so rolling back a savepoint only
+        # discards what was captured inside it.
+        transaction = session.get_nested_transaction() or session.get_transaction()
+        pending = session.info.setdefault('audit_log_pending', [])
+        for action, objs in (('insert', session.new),
+                             ('update', session.dirty),
+                             ('delete', session.deleted)):
+            for obj in objs:
+                if not isinstance(obj, self.models):
+                    continue
+                changes = self.get_changes(obj, action)
+                if changes is None:
+                    continue
+                # Identity keys aren't assigned to new rows until after this.
+                pk = inspect(obj).mapper.primary_key_from_instance(obj)
+                pending.append((transaction, {
+                    'table_name': obj.__table__.name,
+                    'row_id': ','.join(str(v) for v in pk),
+                    'action': action,
+                    'changes': changes,
+                    'user_id': user_id,
+                    'created_at': now,
+                }))
+
+    def get_changes(self, obj, action):
+        state = inspect(obj)
+        changes = {}
+        for attr in state.mapper.column_attrs:
+            if action == 'insert':
+                value = getattr(obj, attr.key)
+                if value is not None:
+                    changes[attr.key] = [None, _jsonable(value)]
+            elif action == 'delete':
+                changes[attr.key] = [_jsonable(state.dict.get(attr.key)), None]
+            else:
+                history = state.attrs[attr.key].history
+                if history.has_changes():
+                    # Empty deleted for in place edits, see the class docs.
+                    old = history.deleted[0] if history.deleted else None
+                    new = history.added[0] if history.added else None
+                    changes[attr.key] = [_jsonable(old), _jsonable(new)]
+        if action == 'update' and not changes:
+            return None
+        return changes
+
+    def commit(self, session):
+        if session.get_nested_transaction() is not None:
+            # A savepoint was released, the outer transaction may still roll
+            # back.
+            return
+        for transaction, entry in session.info.pop('audit_log_pending', ()):
+            self.put(entry)
+
+    def rollback(self, session, previous_transaction):
+        pending = session.info.get('audit_log_pending')
+        if pending:
+            session.info['audit_log_pending'] = [
+                (transaction, entry) for transaction, entry in pending
+                if not self._within(transaction, previous_transaction)]
+
+    @staticmethod
+    def _within(transaction, outer):
+        while transaction is not None:
+            if transaction is outer:
+                return True
+            transaction = transaction.parent
+        return False
+
+    def put(self, entry):
+        try:
+            self.queue.put(entry, block=self.block)
+        except queue.Full:
+            self.dropped += 1
+            self.log.warning('Audit log queue is full, dropped an entry for %s',
+                             entry['table_name'])
+
+    def _take_batch(self, timeout):
+        batch = []
+        try:
+            batch.append(self.queue.get(timeout=timeout))
+            while len(batch) < self.batch_size:
+                batch.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write(self, batch):
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(self.table.insert(), batch)
+        except Exception:
+            self.log.exception('Failed to write %d audit log entries', len(batch))
+        finally:
+            for _ in batch:
+                self.queue.task_done()
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._take_batch(self.flush_interval)
+            if batch:
+                self._write(batch)
+
+    def flush(self):
+        r"""Block until everything queued so far has been written."""
+        self.queue.join()
+
+    def close(self, timeout=10):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        # Write out whatever the writer didn't get to.
+        while True:
+            batch = self._take_batch(0)
+            if not batch:
+                break
+            self._write(batch)
@@ -0,0 +1,111 @@
+from sqlalchemy import and_, not_, true
+
+from ..FilterParser import FilterParser
+from ..LRUCache import LRUCache
+
+OPERATORS = frozenset(('=', 'in', '>', '>=', '<', '<=', 'range'))
+COMPARISONS = (
+    ('>=', '__ge__'),
+    ('<=', '__le__'),
+    ('>', '__gt__'),
+    ('<', '__lt__'),
+)
+
+
+class FilterField(object):
+    r"""How a filter key maps onto a column. ``type`` converts the raw string
+    value (e.g. ``int`` or ``date.fromisoformat``) and ``operators`` limits
+    which of ``=, in, >, >=, <, <=, range`` are allowed."""
+
+    def __init__(self, column, type=str, operators=OPERATORS):
+        self.column = column
+        self.type = type
+        self.operators = frozenset(operators)
+
+    def convert(self, value):
+        try:
+            return self.type(value)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f'Invalid value {value!r} for {self.column}') from e
+
+    def check(self, op):
+        if op not in self.operators:
+            raise ValueError(f'Operator {op!r} is not allowed for {self.column}')
+
+
+class FilterCompiler(object):
+    r"""Compiles :class:`FilterParser` style queries into a SQLAlchemy where
+    clause, so filtering happens in the database.
+
+    ``fields`` maps filter keys onto a :class:`FilterField` or a bare column.
+    Values support ``status:open,closed`` (in), ``age:>30``, ``age:<=30``,
+    ``age:18..30`` (inclusive range, either end optional), and a leading
+    ``-`` negates a filter, as in ``-status:closed``. Quoted values are
+    always compared for equality. Unknown keys are ignored unless ``strict``
+    is set. Compiled clauses are kept in an LRU keyed by the query string.
+
+        compiler = FilterCompiler({'status': Ticket.status,
+                                   'age': FilterField(Ticket.age, int)})
+        Ticket.query.filter(compiler.compile('status:open age:>3'))"""
+
+    def __init__(self, fields, strict=False, cache_size=256, parser=None):
+        self.fields = {
+            key: field if isinstance(field, FilterField) else FilterField(field)
+            for key, field in fields.items()
+        }
+        self.strict = strict
+        self.parser = parser or FilterParser()
+        self.cache = LRUCache(cache_size)
+
+    def compile(self, query_str):
+        clause = self.cache.get(query_str)
+        if clause is None:
+            clause = self._compile(query_str)
+            self.cache.set(query_str, clause)
+        return clause
+
+    def _compile(self, query_str):
+        clauses = []
+        for token in self.parser.parse(query_str).tokens:
+            field = self.fields.get(token.key)
+            if field is None:
+                if self.strict:
+                    raise ValueError(f'Unknown filter {token.key!r}')
+                continue
+
+            if token.quoted:
+                field.check('=')
+                clause = field.column == field.convert(token.value)
+            else:
+                clause = self.compile_value(field, token.value)
+            clauses.append(not_(clause) if token.negated else clause)
+
+        if not clauses:
+            return true()
+        return and_(*clauses)
+
+    def compile_value(self, field, value):
+        column = field.column
+        if ',' in value:
+            field.check('in')
+            return column.in_([field.convert(v) for v in value.split(',') if v])
+
+        for op, method in COMPARISONS:
+            if value.startswith(op):
+                field.check(op)
+                return getattr(column, method)(field.convert(value[len(op):]))
+
+        if '..' in value:
+            field.check('range')
+            low, high = value.split('..', 1)
+            bounds = []
+            if low:
+                bounds.append(column >= field.convert(low))
+            if high:
+                bounds.append(column <= field.convert(high))
+            if not bounds:
+                raise ValueError(f'Empty range for {column}')
+            return and_(*bounds)
+
+        field.check('=')
+        return column == field.convert(value)
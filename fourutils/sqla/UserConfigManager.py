@@ -1,6 +1,7 @@
 import logging
-from typing import Optional
 from functools import wraps
+from contextlib import contextmanager
+from time import monotonic
 
 import msgpack
 from sqlalchemy.exc import SQLAlchemyError, ProgrammingError
@@ -29,47 +30,137 @@ def teardown_db(f):
     return wrapper
 
 
+# Cached in place of a value for keys that have no row in the db.
+_MISSING = object()
+
+# Rows per upsert statement, keeps us under SQLite's bound parameter limit.
+UPSERT_CHUNK_SIZE = 400
+
+
+class RedisCacheVersion(object):
+    r"""A global config version counter kept in redis, bumped on every
+    write so other processes know to drop their cache."""
+
+    def __init__(self, redis, key='fourutils:config_version'):
+        self.redis = redis
+        self.key = key
+
+    def get(self):
+        return int(self.redis.get(self.key) or 0)
+
+    def bump(self):
+        return self.redis.incr(self.key)
+
+
 class UserConfigManager(object):
-    def __init__(self, session, kv_model, defaults={}, strict=True):
+    r"""Caches config key/value rows from the db.
+
+    With a ``version`` (see :class:`RedisCacheVersion`) every write bumps a
+    shared counter and reads drop the cache once it changes, checking it at
+    most once every ``check_interval`` seconds. ``ttl`` drops the cache
+    after that many seconds regardless."""
+
+    def __init__(self, session, kv_model, defaults={}, strict=True,
+                 version=None, ttl=None, check_interval=0):
         self.kv_model = kv_model
         self.session = session
         self.defaults = defaults
         self.strict = strict
+        self.version = version
+        self.ttl = ttl
+        self.check_interval = check_interval
         self.cache = {}
+        # Set once the whole table is cached, misses are then known absent.
+        self.preloaded = False
+        self.cache_version = None
+        self.cache_created_at = monotonic()
+        self.last_checked_at = None
 
         self.log = make_logger(__name__)
-    
-    @teardown_db
-    def get(self, key):
-        key = key.lower()
-        if key in self.cache:
-            # self.log.debug(f"Loaded db_config key from cache: {key}={self.cache[key]}")
-            return self.cache[key]
 
-        kv: Optional[self.kv_model] = None
-        try:
-            kv = self.session.query(self.kv_model).get(key)
-        except ProgrammingError:
-            self.session.rollback()
+    def clear_cache(self):
+        self.cache = {}
+        self.preloaded = False
+        self.cache_created_at = monotonic()
 
-        if kv:
-            # Key was found in db, good to go.
-            cv = self.decode(kv.value)
-            self.cache[key] = cv
-            return cv
+    # Drop the cache if it expired or another process changed the config.
+    def validate_cache(self):
+        now = monotonic()
+        if self.ttl is not None and now - self.cache_created_at > self.ttl:
+            self.clear_cache()
+
+        if self.version is None:
+            return
+        if self.last_checked_at is not None and \
+                now - self.last_checked_at < self.check_interval:
+            return
+        self.last_checked_at = now
+        version = self.version.get()
+        if version != self.cache_version:
+            self.clear_cache()
+            self.cache_version = version
+
+    # Tell other processes about a write, keeping our cache if it was the
+    # only change since we last checked.
+    def bump_version(self):
+        if self.version is None:
+            return
+        version = self.version.bump()
+        if self.cache_version is not None and version == self.cache_version + 1:
+            self.cache_version = version
+        else:
+            self.clear_cache()
+            self.cache_version = None
+
+    # Fetch every uncached key in a single query, caching misses as well.
+    def fetch(self, keys):
+        self.validate_cache()
+        missing = [key for key in keys if key not in self.cache]
+        if not missing:
+            return
+
+        if not self.preloaded:
+            try:
+                rows = self.session.query(self.kv_model) \
+                    .filter(self.kv_model.key.in_(missing)).all()
+            except ProgrammingError:
+                self.session.rollback()
+                return
+            for kv in rows:
+                self.cache[kv.key] = self.decode(kv.value)
+
+        for key in missing:
+            self.cache.setdefault(key, _MISSING)
+
+    def resolve(self, key):
+        value = self.cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
 
         # Key isn't in db, check defaults.
         if key in self.defaults:
-            # self.log.debug(f"Loaded db_config key from defaults: {key}={self.defaults[key]}")
             # Got a default, return it.
             return self.defaults[key]
         elif self.strict:
             # Item wasn't previously set and doesn't have a default.
-            raise KeyError
+            raise KeyError(key)
         else:
             self.log.error(f"Tried to load missing db_config key: {key}")
             return None
 
+    @teardown_db
+    def get(self, key):
+        key = key.lower()
+        self.fetch([key])
+        return self.resolve(key)
+
+    # Get several keys at once, only querying the db for uncached ones.
+    @teardown_db
+    def get_many(self, keys):
+        keys = [key.lower() for key in keys]
+        self.fetch(keys)
+        return {key: self.resolve(key) for key in keys}
+
     @teardown_db
     def set(self, key, value):
         key = key.lower()
@@ -82,18 +173,82 @@ class UserConfigManager(object):
         self.session.commit()
 
         self.log.debug(f'Wrote db_config key to database: {key}={value}')
+        self.bump_version()
         self.cache[kv.key] = value
 
         return kv.value
 
-    # Return a dict of all settings, including defaults.
+    # Write many keys with a single commit, upserting where the dialect can.
     @teardown_db
-    def get_all(self):
+    def set_many(self, mapping):
+        values = {key.lower(): value for key, value in mapping.items()}
+        if not values:
+            return
+        rows = [{'key': key, 'value': self.encode(value)}
+                for key, value in values.items()]
+        self.upsert(rows)
+        self.session.commit()
+
+        self.log.debug(f'Wrote {len(rows)} db_config keys to database.')
+        self.bump_version()
+        self.cache.update(values)
+
+    def upsert(self, rows):
+        stmts = self.build_upserts(self.session.get_bind().dialect.name, rows)
+        if stmts is None:
+            for row in rows:
+                self.session.merge(self.kv_model(**row))
+            return
+        for stmt in stmts:
+            self.session.execute(stmt)
+
+    # Returns None if the dialect has no ON CONFLICT support.
+    def build_upserts(self, dialect, rows):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            return None
+
+        stmts = []
+        table = self.kv_model.__table__
+        for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            stmt = insert(table).values(rows[i:i + UPSERT_CHUNK_SIZE])
+            stmts.append(stmt.on_conflict_do_update(
+                index_elements=['key'],
+                set_={'value': stmt.excluded.value}))
+        return stmts
+
+    # Collect writes in a dict and commit them together on exit, e.g.
+    #   with config.batch() as batch:
+    #       batch['theme'] = 'dark'
+    @contextmanager
+    def batch(self):
+        pending = {}
+        yield pending
+        self.set_many(pending)
+
+    # Load the whole table into the cache, so later misses skip the db.
+    @teardown_db
+    def preload(self):
+        if self.version is not None:
+            self.cache_version = self.version.get()
+            self.last_checked_at = monotonic()
+        self.cache_created_at = monotonic()
         self.cache = {
             r.key: self.decode(r.value)
-            for r in self.kv_model.query.all()
+            for r in self.session.query(self.kv_model).all()
+        }
+        self.preloaded = True
+
+    # Return a dict of all settings, including defaults.
+    def get_all(self):
+        self.preload()
+        return {
+            **self.defaults,
+            **{k: v for k, v in self.cache.items() if v is not _MISSING}
         }
-        return {**self.defaults, **self.cache}
 
     # Remove the key from the db, effectively resetting to the default value.
     @teardown_db
@@ -102,7 +257,8 @@ class UserConfigManager(object):
         if kv:
             self.session.delete(kv)
             self.session.commit()
-        self.cache.pop(key, None)
+            self.bump_version()
+        self.cache[key] = _MISSING
         # self.log.debug(f'Reset db_config key ({key}).')
 
     # Encode the value before inserting into the db.
@@ -1,3 +1,6 @@
-from .UserConfigManager import UserConfigManager
+from .UserConfigManager import UserConfigManager, RedisCacheVersion
+from .AsyncUserConfigManager import AsyncUserConfigManager
+from .FilterCompiler import FilterCompiler, FilterField
 
-__all__ = ['UserConfigManager']
\ No newline at end of file
+__all__ = ['UserConfigManager', 'RedisCacheVersion', 'AsyncUserConfigManager',
+           'FilterCompiler', 'FilterField']
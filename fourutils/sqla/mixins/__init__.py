@@ -1,3 +1,3 @@
-from .audit import AuditMixin
+from .audit import AuditMixin, audit_user
 
-__all__ = ["AuditMixin"]
+__all__ = ["AuditMixin", "audit_user"]
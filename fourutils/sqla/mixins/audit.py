@@ -1,11 +1,26 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
-from sqlalchemy import Column, Integer, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, event, inspect
+from sqlalchemy.orm import relationship, Session
 from sqlalchemy.ext.declarative import declared_attr
 from flask_login import current_user
 
 
+_UNSET = object()
+_audit_user_id = ContextVar('audit_user_id', default=_UNSET)
+
+
 class AuditMixin(object):
+    r"""Records when and by whom rows were created and last updated.
+
+    The acting user is resolved once per flush for ORM writes and once per
+    statement for Core ``insert()``/``update()`` and bulk calls, rather than
+    once per column per row. Set ``__audit_lazy__ = 'selectin'`` on a model
+    to batch load the ``created_by``/``updated_by`` users."""
+
+    __audit_lazy__ = 'select'
+
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
@@ -14,7 +29,7 @@ class AuditMixin(object):
         return Column(Integer,
             ForeignKey('user.id', name='fk_%s_created_by_id' % cls.__name__, use_alter=True),
             # nullable=False,
-            default=_current_user_id_or_none
+            default=_current_user_id_for_statement
         )
 
     @declared_attr
@@ -22,7 +37,8 @@ class AuditMixin(object):
         return relationship(
             'User',
             primaryjoin='User.id == %s.created_by_id' % cls.__name__,
-            remote_side='User.id'
+            remote_side='User.id',
+            lazy=cls.__audit_lazy__
         )
 
     @declared_attr
@@ -30,8 +46,8 @@ class AuditMixin(object):
         return Column(Integer,
             ForeignKey('user.id', name='fk_%s_updated_by_id' % cls.__name__, use_alter=True),
             # nullable=False,
-            default=_current_user_id_or_none,
-            onupdate=_current_user_id_or_none
+            default=_current_user_id_for_statement,
+            onupdate=_current_user_id_for_statement
         )
 
     @declared_attr
@@ -39,12 +55,57 @@ class AuditMixin(object):
         return relationship(
             'User',
             primaryjoin='User.id == %s.updated_by_id' % cls.__name__,
-            remote_side='User.id'
+            remote_side='User.id',
+            lazy=cls.__audit_lazy__
         )
 
 
+@contextmanager
+def audit_user(user_id):
+    r"""Attribute writes inside the block to ``user_id`` instead of the
+    logged in user, for scripts, workers and bulk jobs."""
+    token = _audit_user_id.set(user_id)
+    try:
+        yield
+    finally:
+        _audit_user_id.reset(token)
+
+
 def _current_user_id_or_none():
+    user_id = _audit_user_id.get()
+    if user_id is not _UNSET:
+        return user_id
     try:
         return current_user.id
     except:
         return None
+
+
+def _current_user_id_for_statement(context):
+    # The execution context is shared by every row of an executemany, so
+    # this only resolves the user once per statement.
+    user_id = getattr(context, '_audit_user_id', _UNSET)
+    if user_id is _UNSET:
+        user_id = context._audit_user_id = _current_user_id_or_none()
+    return user_id
+
+
+@event.listens_for(Session, 'before_flush')
+def _stamp_audit_users(session, flush_context, instances):
+    user_id = _UNSET
+    for obj in session.new:
+        if isinstance(obj, AuditMixin):
+            if user_id is _UNSET:
+                user_id = _current_user_id_or_none()
+            if obj.created_by_id is None:
+                obj.created_by_id = user_id
+            if obj.updated_by_id is None:
+                obj.updated_by_id = user_id
+
+    for obj in session.dirty:
+        if isinstance(obj, AuditMixin) and \
+                session.is_modified(obj, include_collections=False) and \
+                not inspect(obj).attrs.updated_by_id.history.has_changes():
+            if user_id is _UNSET:
+                user_id = _current_user_id_or_none()
+            obj.updated_by_id = user_id
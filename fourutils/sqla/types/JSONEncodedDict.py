@@ -1,23 +1,154 @@
 import json
+from functools import partial
 from typing import Union
 
-from sqlalchemy.types import TypeDecorator, Text
+from sqlalchemy.ext.mutable import MutableDict
+from sqlalchemy.types import TypeDecorator, Text, LargeBinary
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 
 JSONEncodable = Union[dict, list, str]
 
+# name -> (dumps, loads, binary)
+codecs = {
+    'json': (json.dumps, json.loads, False),
+}
+if orjson is not None:
+    codecs['orjson'] = (lambda value: orjson.dumps(value).decode(),
+                        orjson.loads, False)
+if msgpack is not None:
+    codecs['msgpack'] = (partial(msgpack.packb, use_bin_type=True),
+                         partial(msgpack.unpackb, raw=False), True)
+
+
+_UNPARSED = object()
+
+
+class LazyJSONValue(object):
+    """Holds the raw column text and only decodes it on first access.
+
+    Reads, item assignment and attribute access are passed through to the
+    decoded value, which is also available as ``.value``. It isn't an actual
+    dict or list, so unwrap it with ``.value`` before handing it to code that
+    type checks or serializes it."""
+
+    __slots__ = ('raw', 'loads', '_value')
+
+    def __init__(self, raw, loads):
+        self.raw = raw
+        self.loads = loads
+        self._value = _UNPARSED
+
+    @property
+    def parsed(self):
+        return self._value is not _UNPARSED
+
+    @property
+    def value(self):
+        if self._value is _UNPARSED:
+            self._value = self.loads(self.raw)
+        return self._value
+
+    def __getattr__(self, name):
+        if name.startswith('__') or name in ('raw', 'loads', '_value',
+                                             'value', 'parsed'):
+            # Don't delegate protocol lookups, and don't recurse on a half
+            # built instance, e.g. during copy.
+            raise AttributeError(name)
+        return getattr(self.value, name)
+
+    def __getitem__(self, key):
+        return self.value[key]
+
+    def __setitem__(self, key, value):
+        self.value[key] = value
+
+    def __delitem__(self, key):
+        del self.value[key]
+
+    def __iter__(self):
+        return iter(self.value)
+
+    def __len__(self):
+        return len(self.value)
+
+    def __contains__(self, item):
+        return item in self.value
+
+    def __bool__(self):
+        return bool(self.value)
+
+    def __eq__(self, other):
+        if isinstance(other, LazyJSONValue):
+            if not (self.parsed or other.parsed):
+                return self.raw == other.raw
+            other = other.value
+        return self.value == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        if self.parsed:
+            return f'LazyJSONValue({self._value!r})'
+        return 'LazyJSONValue(<unparsed>)'
+
 
 class JSONEncodedDict(TypeDecorator):
-    """Represents an immutable structure as a json-encoded string."""
+    """Represents an immutable structure as a json-encoded string.
+
+    ``codec`` picks the encoder, ``'orjson'`` is a faster drop-in for the
+    default ``'json'`` while ``'msgpack'`` stores the structure in a binary
+    column instead.
+
+    With ``lazy`` set results come back as a :class:`LazyJSONValue` which
+    isn't decoded until it is used, and is bound back as the original text
+    if it never was."""
 
     impl = Text
+    cache_ok = True
+
+    def __init__(self, *args, codec='json', lazy=False, **kwargs):
+        if codec not in codecs:
+            raise ValueError(f'JSONEncodedDict codec {codec!r} is not available')
+        self.codec = codec
+        self.lazy = lazy
+        self.dumps, self.loads, self.binary = codecs[codec]
+        super().__init__(*args, **kwargs)
+
+    def load_dialect_impl(self, dialect):
+        if self.binary:
+            return dialect.type_descriptor(LargeBinary())
+        return super().load_dialect_impl(dialect)
 
     def process_bind_param(self, value: JSONEncodable, dialect) -> str:
+        if isinstance(value, LazyJSONValue):
+            if not value.parsed:
+                return value.raw
+            value = value.value
         if value is not None:
-            value = json.dumps(value)
+            value = self.dumps(value)
         return value
 
     def process_result_value(self, value: str, dialect) -> JSONEncodable:
         if value is not None:
-            value = json.loads(value)
-        return value
\ No newline at end of file
+            if self.lazy:
+                return LazyJSONValue(value, self.loads)
+            value = self.loads(value)
+        return value
+
+
+def mutable_json_dict(codec='json'):
+    """A :class:`JSONEncodedDict` whose top level keys are tracked in place,
+    so ``row.data['key'] = value`` is flushed without reassigning the dict.
+    Only modified rows are re-encoded on flush. Changes to nested structures
+    still need the attribute reassigned or ``flag_modified``."""
+    return MutableDict.as_mutable(JSONEncodedDict(codec=codec))
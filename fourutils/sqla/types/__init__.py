@@ -1,3 +1,3 @@
-from .JSONEncodedDict import JSONEncodedDict
+from .JSONEncodedDict import JSONEncodedDict, LazyJSONValue, mutable_json_dict
 
-__all__ = ['JSONEncodedDict']
\ No newline at end of file
+__all__ = ['JSONEncodedDict', 'LazyJSONValue', 'mutable_json_dict']
\ No newline at end of file
@@ -1,21 +1,65 @@
+import asyncio
 import json
 import os
 import zipfile
+from functools import partial
 from io import BytesIO
 from tempfile import TemporaryDirectory
-from hashlib import sha512
+from hashlib import sha256, sha512
 import time
 
 from PIL import Image
 from OpenSSL import crypto
 
+from ..LRUCache import LRUCache
 from ..log import make_logger
 
 
+class _StreamBuffer(object):
+    r"""An unseekable sink for ZipFile, drained after every member."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
 class PushPackageBuilder(object):
+    r"""Builds signed Safari push packages.
+
+    Icons are resized and hashed once, and finished packages are kept in an
+    LRU of ``cache_size`` entries keyed by a digest of the effective website
+    dict, so repeat requests are served without signing again.
+
+    Given an ``executor``, icons are resized in parallel on it, so
+    :meth:`build_images` mustn't be called from one of its threads. Builds
+    sign on the calling thread, except :meth:`build_pushpackage_async` which
+    builds on ``executor`` (or the loop's default) so asyncio servers aren't
+    blocked; under gevent, call the sync methods through the hub's
+    threadpool. :meth:`stream_pushpackage` yields the zip as it's written,
+    for WSGI responses or writing straight to a file.
 
-    def __init__(self, icon_path, website_dict, key_path, key_password=None):
+    ``resample`` is passed to :meth:`PIL.Image.Image.resize`, ``None``
+    keeps Pillow's default."""
+
+    def __init__(self, icon_path, website_dict, key_path, key_password=None,
+                 cache_size=32, executor=None, resample=None):
         self.images = {}
+        self.image_hashes = {}
+        self.icon_path = None
+        self.packages = LRUCache(cache_size)
+        self.executor = executor
+        self.resample = resample
         self.website_dict = website_dict
         self.build_images(icon_path)
         with open(key_path, 'rb') as f:
@@ -32,55 +76,148 @@ class PushPackageBuilder(object):
 
     def build_images(self, image_src, force=False):
         sizecats = (16, 32, 128)
-        if len(self.images.values()) == sizecats * 2 and not force:
+        if len(self.images) == len(sizecats) * 2 and \
+                image_src == self.icon_path and not force:
             # Use cached images.
             return
         else:
             # Reset self.images, we want to regen.
             self.images = {}
+            self.packages.clear()
 
-        with Image.open(image_src) as im:
-            for sizecat in sizecats:
-                with BytesIO() as nim_f:
-                    nim = im.resize((sizecat, sizecat))
-                    nim.save(nim_f, format='png')
-                    self.images[f'icon_{sizecat}x{sizecat}.png'] = nim_f.getvalue()
+        sizes = {}
+        for sizecat in sizecats:
+            sizes[f'icon_{sizecat}x{sizecat}.png'] = sizecat
+            sizes[f'icon_{sizecat}x{sizecat}@2x.png'] = sizecat * 2
 
-                with BytesIO() as nim_f:
-                    nim = im.resize((sizecat*2, sizecat*2))
-                    nim.save(nim_f, format='png')
-                    self.images[f'icon_{sizecat}x{sizecat}@2x.png'] = nim_f.getvalue()
+        with Image.open(image_src) as im:
+            # Decode once up front, rather than racing to in every thread.
+            im.load()
+            resized = self.map(partial(self.resize_image, im), sizes.values())
+            self.images = dict(zip(sizes, resized))
 
-    def build_zip(self, zf, website_dict):
+        self.image_hashes = {
+            path: sha512(data).hexdigest() for path, data in self.images.items()
+        }
+        self.icon_path = image_src
+
+    def resize_image(self, im, size):
+        with BytesIO() as nim_f:
+            if self.resample is None:
+                nim = im.resize((size, size))
+            else:
+                nim = im.resize((size, size), self.resample)
+            nim.save(nim_f, format='png')
+            return nim_f.getvalue()
+
+    def map(self, fn, items):
+        if self.executor is None:
+            return list(map(fn, items))
+        return list(self.executor.map(fn, items))
+
+    def iter_zip(self, zf, website_dict):
+        r"""Write the package to ``zf``, yielding after every member."""
         manifest = {}
         for path, data in self.images.items():
             full_path = os.path.join('icon.iconset/', path)
             zf.writestr(full_path, data)
-            manifest[full_path] = self.get_hash_details(data)
+            manifest[full_path] = self.get_hash_details(
+                sha_hash=self.image_hashes[path])
+            yield
 
         website_data = json.dumps(website_dict).encode()
         zf.writestr('website.json', website_data)
         manifest['website.json'] = self.get_hash_details(website_data)
+        yield
 
         manifest_data = json.dumps(manifest).encode()
         zf.writestr('manifest.json', manifest_data)
         self.log.debug('Wrote manifest: %s', manifest_data)
+        yield
 
         zf.writestr('signature', self.sign_manifest(manifest_data))
+        yield
+
+    def build_zip(self, zf, website_dict):
+        for _ in self.iter_zip(zf, website_dict):
+            pass
+
+    def get_website_dict(self, merge_website_dict):
+        return {
+            **self.website_dict,
+            **merge_website_dict
+        }
+
+    def get_package_key(self, website_dict):
+        return sha256(json.dumps(website_dict, sort_keys=True).encode()).hexdigest()
+
+    def build_package(self, website_dict):
+        r"""Build, cache and return the package bytes, without checking the
+        cache first."""
+        with BytesIO() as buf:
+            with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+                self.log.debug('Building new zip in %s', zf)
+                self.build_zip(zf, website_dict=website_dict)
+            package = buf.getvalue()
+        self.packages.set(self.get_package_key(website_dict), package)
+        return package
 
     def build_pushpackage(self, output_file=None, merge_website_dict={}):
         output_file = output_file or BytesIO()
+        website_dict = self.get_website_dict(merge_website_dict)
+
+        package = self.packages.get(self.get_package_key(website_dict))
+        if package is None:
+            package = self.build_package(website_dict)
 
-        with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-            self.log.debug('Building new zip in %s', zf)
-            self.build_zip(zf, website_dict={
-                **self.website_dict,
-                **merge_website_dict
-            })
+        output_file.write(package)
         output_file.seek(0)
 
         return output_file
 
+    async def build_pushpackage_async(self, merge_website_dict={}):
+        r"""Like :meth:`build_pushpackage`, building on ``executor`` (or the
+        loop's default executor) so signing doesn't block the event loop."""
+        website_dict = self.get_website_dict(merge_website_dict)
+
+        package = self.packages.get(self.get_package_key(website_dict))
+        if package is None:
+            loop = asyncio.get_running_loop()
+            package = await loop.run_in_executor(
+                self.executor, self.build_package, website_dict)
+
+        return BytesIO(package)
+
+    def stream_pushpackage(self, merge_website_dict={}):
+        r"""Yield the package as bytes while it's being built, e.g. as a WSGI
+        response body. The finished package is cached as usual."""
+        website_dict = self.get_website_dict(merge_website_dict)
+
+        key = self.get_package_key(website_dict)
+        package = self.packages.get(key)
+        if package is not None:
+            yield package
+            return
+
+        buf = _StreamBuffer()
+        chunks = []
+        with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for _ in self.iter_zip(zf, website_dict):
+                chunks.append(buf.take())
+                yield chunks[-1]
+        # The central directory, written on close.
+        chunks.append(buf.take())
+        yield chunks[-1]
+
+        self.packages.set(key, b''.join(chunks))
+
+    def write_pushpackage(self, output_file, merge_website_dict={}):
+        r"""Stream the package into ``output_file``, which needn't be
+        seekable."""
+        for chunk in self.stream_pushpackage(merge_website_dict):
+            output_file.write(chunk)
+        return output_file
+
     def sign_manifest(self, manifest_data):
         # Fuck me. Thanks @WhyNotHugo: https://stackoverflow.com/a/41553623
         bio_in = crypto._new_mem_buf(manifest_data)
@@ -0,0 +1,173 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('sqlalchemy')
+pytest.importorskip('aiosqlite')
+pytest.importorskip('msgpack')
+
+from sqlalchemy import Column, LargeBinary, String  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.orm import declarative_base  # noqa: E402
+
+from fourutils.sqla import AsyncUserConfigManager  # noqa: E402
+
+Base = declarative_base()
+
+
+class Config(Base):
+    __tablename__ = 'config'
+    key = Column(String(64), primary_key=True)
+    value = Column(LargeBinary)
+
+
+class SlowManager(AsyncUserConfigManager):
+    r"""Blocks loads until released, counting them."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loads = 0
+        self.release = asyncio.Event()
+
+    async def load(self, keys):
+        self.loads += 1
+        await self.release.wait()
+        await super().load(keys)
+
+
+class SlowSelectManager(AsyncUserConfigManager):
+    r"""Blocks after reading rows, before they're cached."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.selected = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def select_rows(self, keys=None):
+        rows = await super().select_rows(keys)
+        self.selected.set()
+        await self.release.wait()
+        return rows
+
+
+async def make_manager(cls=AsyncUserConfigManager):
+    engine = create_async_engine('sqlite+aiosqlite://')
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return cls(async_sessionmaker(engine), Config, defaults={'theme': 'light'})
+
+
+def test_get_and_set():
+    async def main():
+        manager = await make_manager()
+        assert await manager.get('theme') == 'light'
+        await manager.set('theme', 'dark')
+        await manager.set_many({'lang': 'en'})
+        manager.clear_cache()
+        assert await manager.get_many(['theme', 'lang']) == {
+            'theme': 'dark', 'lang': 'en'}
+    asyncio.run(main())
+
+
+def test_concurrent_misses_share_a_load():
+    async def main():
+        manager = await make_manager(SlowManager)
+        tasks = [asyncio.create_task(manager.get('theme')) for _ in range(5)]
+        await asyncio.sleep(0)
+        manager.release.set()
+        assert await asyncio.gather(*tasks) == ['light'] * 5
+        assert manager.loads == 1
+    asyncio.run(main())
+
+
+def test_cancelled_loader_does_not_cancel_waiters():
+    async def main():
+        manager = await make_manager(SlowManager)
+        loader = asyncio.create_task(manager.get('theme'))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(manager.get('theme'))
+        await asyncio.sleep(0)
+
+        loader.cancel()
+        await asyncio.sleep(0)
+        manager.release.set()
+
+        assert await waiter == 'light'
+        assert loader.cancelled()
+        # The waiter fetched again itself.
+        assert manager.loads == 2
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_does_not_cancel_loader():
+    async def main():
+        manager = await make_manager(SlowManager)
+        loader = asyncio.create_task(manager.get('theme'))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(manager.get('theme'))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        await asyncio.sleep(0)
+        manager.release.set()
+
+        assert await loader == 'light'
+        assert waiter.cancelled()
+        assert manager.loads == 1
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize('write', [
+    lambda manager: manager.set('theme', 'dark'),
+    lambda manager: manager.set_many({'theme': 'dark'}),
+])
+def test_fetch_does_not_overwrite_a_newer_write(write):
+    async def main():
+        manager = await make_manager(SlowSelectManager)
+        manager.release.set()
+        await manager.set('theme', 'old')
+        manager.clear_cache()
+        manager.release.clear()
+
+        get = asyncio.create_task(manager.get('theme'))
+        await manager.selected.wait()
+        await write(manager)
+        manager.release.set()
+
+        assert await get == 'dark'
+        assert await manager.get('theme') == 'dark'
+    asyncio.run(main())
+
+
+def test_fetch_does_not_undo_a_reset():
+    async def main():
+        manager = await make_manager(SlowSelectManager)
+        manager.release.set()
+        await manager.set('theme', 'dark')
+        manager.clear_cache()
+        manager.release.clear()
+
+        get = asyncio.create_task(manager.get('theme'))
+        await manager.selected.wait()
+        await manager.reset('theme')
+        manager.release.set()
+
+        assert await get == 'light'
+    asyncio.run(main())
+
+
+def test_preload_does_not_overwrite_a_newer_write():
+    async def main():
+        manager = await make_manager(SlowSelectManager)
+        manager.release.set()
+        await manager.set('theme', 'old')
+        manager.release.clear()
+
+        preload = asyncio.create_task(manager.get_all())
+        await manager.selected.wait()
+        await manager.set('theme', 'dark')
+        manager.release.set()
+
+        assert (await preload)['theme'] == 'dark'
+        assert await manager.get('theme') == 'dark'
+    asyncio.run(main())
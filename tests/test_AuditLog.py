@@ -0,0 +1,125 @@
+import pytest
+
+pytest.importorskip('sqlalchemy')
+pytest.importorskip('flask_login')
+
+from sqlalchemy import Column, Integer, MetaData, create_engine, select  # noqa: E402
+from sqlalchemy.ext.mutable import MutableDict  # noqa: E402
+from sqlalchemy.orm import Session, declarative_base  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from fourutils.sqla.AuditLog import AuditLog  # noqa: E402
+from fourutils.sqla.types import JSONEncodedDict  # noqa: E402
+
+Base = declarative_base()
+
+
+class Thing(Base):
+    __tablename__ = 'thing'
+    id = Column(Integer, primary_key=True)
+    data = Column(MutableDict.as_mutable(JSONEncodedDict))
+
+
+@pytest.fixture
+def audit():
+    engine = create_engine('sqlite://', poolclass=StaticPool,
+                           connect_args={'check_same_thread': False})
+    Base.metadata.create_all(engine)
+    table = AuditLog.make_table(MetaData())
+    table.create(engine)
+    log = AuditLog(engine, table, models=(Thing,), flush_interval=0.05)
+    yield engine, log
+    log.close()
+
+
+def entries(engine, log):
+    log.flush()
+    with engine.connect() as conn:
+        return conn.execute(select(log.table).order_by(log.table.c.id)).all()
+
+
+def test_structures_are_logged_as_json(audit):
+    engine, log = audit
+    with Session(engine) as session:
+        log.register(session)
+        session.add(Thing(id=1, data={'x': [1, {'y': 2}]}))
+        session.commit()
+
+        thing = session.get(Thing, 1)
+        thing.data = {'x': 3}
+        session.commit()
+
+    insert, update = entries(engine, log)
+    assert insert.action == 'insert'
+    assert insert.changes['data'] == [None, {'x': [1, {'y': 2}]}]
+    assert update.changes == {'data': [{'x': [1, {'y': 2}]}, {'x': 3}]}
+
+
+def test_in_place_edits_have_no_old_value(audit):
+    engine, log = audit
+    with Session(engine) as session:
+        log.register(session)
+        session.add(Thing(id=1, data={'x': 1}))
+        session.commit()
+
+        thing = session.get(Thing, 1)
+        thing.data['x'] = 2
+        session.commit()
+
+    _, update = entries(engine, log)
+    assert update.changes == {'data': [None, {'x': 2}]}
+
+
+def test_rolled_back_changes_are_not_logged(audit):
+    engine, log = audit
+    with Session(engine) as session:
+        log.register(session)
+        session.add(Thing(id=1, data={}))
+        session.flush()
+        session.rollback()
+
+    assert entries(engine, log) == []
+
+
+def test_savepoint_rollback_keeps_outer_changes(audit):
+    engine, log = audit
+    with Session(engine) as session:
+        log.register(session)
+        session.add(Thing(id=1, data={}))
+        session.flush()
+
+        savepoint = session.begin_nested()
+        session.add(Thing(id=2, data={}))
+        session.flush()
+        savepoint.rollback()
+        session.commit()
+
+    assert [(e.action, e.row_id) for e in entries(engine, log)] == [('insert', '1')]
+
+
+def test_released_savepoint_waits_for_the_outer_commit(audit):
+    engine, log = audit
+    with Session(engine) as session:
+        log.register(session)
+        session.add(Thing(id=1, data={}))
+        with session.begin_nested():
+            session.add(Thing(id=2, data={}))
+        log.flush()
+        assert entries(engine, log) == []
+
+        session.rollback()
+    assert entries(engine, log) == []
+
+    with Session(engine) as session:
+        log.register(session)
+        with session.begin_nested():
+            session.add(Thing(id=3, data={}))
+        session.commit()
+    assert [e.row_id for e in entries(engine, log)] == ['3']
+
+
+def test_fork_hook_does_nothing_once_closed(audit):
+    engine, log = audit
+    log.close()
+    log._restart()
+    assert not log._thread.is_alive()
@@ -0,0 +1,114 @@
+from datetime import date
+
+import pytest
+
+pytest.importorskip('sqlalchemy')
+
+from sqlalchemy import Column, Date, Integer, String, create_engine, select  # noqa: E402
+from sqlalchemy.orm import Session, declarative_base  # noqa: E402
+
+from fourutils.sqla import FilterCompiler, FilterField  # noqa: E402
+
+Base = declarative_base()
+
+
+class Ticket(Base):
+    __tablename__ = 'ticket'
+    id = Column(Integer, primary_key=True)
+    status = Column(String(16))
+    age = Column(Integer)
+    opened = Column(Date)
+
+
+@pytest.fixture(scope='module')
+def session():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([
+            Ticket(id=1, status='open', age=10, opened=date(2020, 1, 1)),
+            Ticket(id=2, status='closed', age=20, opened=date(2020, 6, 1)),
+            Ticket(id=3, status='pending', age=30, opened=date(2021, 1, 1)),
+            Ticket(id=4, status='open', age=40, opened=date(2021, 6, 1)),
+        ])
+        session.commit()
+        yield session
+
+
+@pytest.fixture
+def compiler():
+    return FilterCompiler({
+        'status': Ticket.status,
+        'age': FilterField(Ticket.age, int),
+        'opened': FilterField(Ticket.opened, date.fromisoformat),
+        'id': FilterField(Ticket.id, int, operators=('=', 'in')),
+    })
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('', [1, 2, 3, 4]),
+    ('status:open', [1, 4]),
+    ('status:"open"', [1, 4]),
+    ('status:open,closed', [1, 2, 4]),
+    ('status:open, free text', [1, 4]),
+    ('age:>20', [3, 4]),
+    ('age:>=20', [2, 3, 4]),
+    ('age:<20', [1]),
+    ('age:<=20', [1, 2]),
+    ('age:20..30', [2, 3]),
+    ('age:..20', [1, 2]),
+    ('age:30..', [3, 4]),
+    ('opened:2020-06-01..2021-01-01', [2, 3]),
+    ('-status:open', [2, 3]),
+    ('-age:>20', [1, 2]),
+    ('status:open age:>20', [4]),
+    ('id:1,3', [1, 3]),
+    ('unknown:thing status:closed', [2]),
+])
+def test_compile(session, compiler, query, expected):
+    clause = compiler.compile(query)
+    rows = session.scalars(select(Ticket.id).where(clause).order_by(Ticket.id))
+    assert list(rows) == expected
+
+
+@pytest.mark.parametrize('query', [
+    'age:abc',
+    'age:>abc',
+    'age:1..x',
+    'age:..',
+    'opened:yesterday',
+    'id:>1',
+    'id:1..3',
+])
+def test_invalid_values_and_operators(compiler, query):
+    with pytest.raises(ValueError):
+        compiler.compile(query)
+
+
+def test_strict_rejects_unknown_keys():
+    compiler = FilterCompiler({'status': Ticket.status}, strict=True)
+    compiler.compile('status:open')
+    with pytest.raises(ValueError, match='unknown'):
+        compiler.compile('status:open unknown:thing')
+
+
+def test_compiled_clauses_are_cached(compiler):
+    clause = compiler.compile('age:>20')
+    assert compiler.compile('age:>20') is clause
+    assert compiler.cache.stats['hits'] == 1
+    assert compiler.compile('age:>21') is not clause
+
+
+def test_cache_is_bounded():
+    compiler = FilterCompiler({'age': FilterField(Ticket.age, int)}, cache_size=2)
+    for i in range(3):
+        compiler.compile(f'age:{i}')
+    assert len(compiler.cache) == 2
+    assert 'age:0' not in compiler.cache
+    assert compiler.cache.stats['evictions'] == 1
+
+
+def test_failed_compiles_are_not_cached(compiler):
+    with pytest.raises(ValueError):
+        compiler.compile('age:abc')
+    assert 'age:abc' not in compiler.cache
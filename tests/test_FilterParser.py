@@ -0,0 +1,48 @@
+from fourutils import FilterParser
+
+
+def test_match_and_clear_filters():
+    parser = FilterParser()
+    query = 'user:42 a friendly man good:"needs spaces"'
+
+    assert parser.match('user', query) == '42'
+    assert parser.match('good', query) == 'needs spaces'
+    assert parser.match('missing', query) is None
+    assert list(parser.match_all(query)) == [('user', '42'), ('good', 'needs spaces')]
+    assert parser.clear_filters(query) == 'a friendly man'
+
+
+def test_parse_indexes_repeated_keys():
+    parsed = FilterParser().parse('label:a text label:"b c" is:open')
+
+    assert 'label' in parsed
+    assert parsed.get('label') == 'a'
+    assert parsed.get_all('label') == ('a', 'b c')
+    assert parsed.get_all('missing') == ()
+    assert parsed.text == 'text'
+    assert [token.quoted for token in parsed.tokens] == [False, True, False]
+
+
+def test_parse_negated_filters():
+    query = '-status:closed foo bar'
+    parsed = FilterParser().parse(query)
+
+    token, = parsed.tokens
+    assert token.negated
+    assert token.span == (0, len('-status:closed'))
+    assert query[slice(*token.span)] == '-status:closed'
+    assert parsed.text == 'foo bar'
+    assert FilterParser().clear_filters(query) == 'foo bar'
+
+
+def test_dash_inside_a_word_is_not_negation():
+    parsed = FilterParser().parse('foo-status:closed')
+    token, = parsed.tokens
+    assert not token.negated
+    assert parsed.text == 'foo-'
+
+
+def test_parse_results_are_cached():
+    parser = FilterParser()
+    query = 'cached:query only here'
+    assert parser.parse(query) is parser.parse(query)
@@ -0,0 +1,35 @@
+import pytest
+
+from fourutils import HashRing
+
+
+KEYS = [f'key:{i}' for i in range(10000)]
+
+
+def test_empty_ring():
+    with pytest.raises(KeyError):
+        HashRing().get_node('anything')
+
+
+def test_adding_a_node_moves_about_one_nth_of_keys():
+    ring = HashRing(['a', 'b', 'c', 'd'])
+    before = {key: ring.get_node(key) for key in KEYS}
+
+    ring.add('e')
+    moved = [key for key in KEYS if ring.get_node(key) != before[key]]
+
+    # Ideally 1/5 of the keys, all of them onto the new node.
+    assert 0.1 < len(moved) / len(KEYS) < 0.3
+    assert all(ring.get_node(key) == 'e' for key in moved)
+
+
+def test_removing_a_node_only_moves_its_keys():
+    ring = HashRing(['a', 'b', 'c', 'd'])
+    before = {key: ring.get_node(key) for key in KEYS}
+
+    ring.remove('d')
+    for key in KEYS:
+        if before[key] != 'd':
+            assert ring.get_node(key) == before[key]
+        else:
+            assert ring.get_node(key) in ('a', 'b', 'c')
@@ -0,0 +1,38 @@
+import zipfile
+from hashlib import md5
+
+import pytest
+
+from fourutils import IdenticonBatch, IdenticonGenerator
+
+HASHES = [md5(str(i).encode()).hexdigest() for i in range(20)]
+
+
+@pytest.mark.parametrize('format', ['svg', 'png'])
+def test_write_directory(tmp_path, format):
+    if format == 'png':
+        pytest.importorskip('PIL')
+    generator = IdenticonGenerator()
+    batch = IdenticonBatch(generator, format=format, workers=0, chunk_size=8)
+    batch.write_directory(HASHES, tmp_path)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == \
+        sorted(f'{hash}.{format}' for hash in HASHES)
+    if format == 'svg':
+        assert (tmp_path / f'{HASHES[0]}.svg').read_text() == generator.dump(HASHES[0])
+
+
+def test_write_zip(tmp_path):
+    batch = IdenticonBatch(format='svg', workers=0)
+    batch.write_zip(HASHES, tmp_path / 'out.zip')
+    with zipfile.ZipFile(tmp_path / 'out.zip') as archive:
+        assert len(archive.namelist()) == len(HASHES)
+
+
+@pytest.mark.parametrize('format', ['svg', 'png'])
+def test_paths_outside_the_output_are_rejected(tmp_path, format):
+    output = tmp_path / 'out'
+    batch = IdenticonBatch(format=format, workers=0)
+    with pytest.raises(ValueError):
+        batch.write_directory(['a' * 15 + '/../../escaped0bbbbbbb'], output)
+    assert list(tmp_path.rglob('escaped*')) == []
@@ -0,0 +1,42 @@
+import os
+from hashlib import md5
+
+import pytest
+
+from fourutils import IdenticonCache, IdenticonGenerator
+
+HASH = md5(b'user@example.com').hexdigest()
+
+
+def test_get_caches_rendered_svg():
+    cache = IdenticonCache(IdenticonGenerator())
+    assert cache.get(HASH) == IdenticonGenerator().dump(HASH).encode()
+    assert cache.get(HASH) is cache.get(HASH)
+    assert cache.cache.stats['hits'] == 2
+
+
+def test_etags_are_stable_and_depend_on_settings():
+    etag = IdenticonCache(IdenticonGenerator()).get_etag(HASH)
+    assert IdenticonCache(IdenticonGenerator()).get_etag(HASH) == etag
+    assert IdenticonCache(IdenticonGenerator()).get_etag(HASH.upper()) == etag
+    assert IdenticonCache(IdenticonGenerator(image_size=128)).get_etag(HASH) != etag
+    assert IdenticonCache(IdenticonGenerator()).get_etag(HASH, 'png') != etag
+
+
+def test_directory_store_is_shared(tmp_path):
+    first = IdenticonCache(IdenticonGenerator(), directory=str(tmp_path))
+    data = first.get(HASH)
+    assert os.listdir(tmp_path) == [f'{first.get_etag(HASH)}.svg']
+
+    second = IdenticonCache(IdenticonGenerator(), directory=str(tmp_path))
+    second.renderers = {'svg': None}
+    assert second.get(HASH) == data
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    cache = IdenticonCache(IdenticonGenerator(), directory=str(tmp_path))
+    with pytest.raises(ValueError):
+        cache.get(HASH, '../../etc/passwd')
+    with pytest.raises(ValueError):
+        cache.get_etag(HASH, 'gif')
+    assert os.listdir(tmp_path) == []
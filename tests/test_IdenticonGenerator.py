@@ -0,0 +1,54 @@
+from hashlib import md5
+
+import pytest
+
+from fourutils.IdenticonGenerator import IdenticonGenerator
+
+np = pytest.importorskip('numpy')
+
+
+@pytest.mark.parametrize('pixels', [4, 5])
+def test_get_grids_matches_get_grid(pixels):
+    generator = IdenticonGenerator(pixels=pixels)
+    hashes = [md5(str(i).encode()).hexdigest() for i in range(50)]
+    hashes.append(hashes[0].upper())
+
+    grids = generator.get_grids(hashes)
+    assert grids.shape == (len(hashes), pixels, pixels)
+    for hash, grid in zip(hashes, grids):
+        assert grid.tolist() == generator.get_grid(hash)
+
+
+@pytest.mark.parametrize('hash', [
+    '0',
+    'zz' * 16,
+    'é' * 32,
+    '00000000000000\x00' + '0' * 17,
+])
+def test_invalid_hashes_are_rejected(hash):
+    generator = IdenticonGenerator()
+    valid = md5(b'').hexdigest()
+    with pytest.raises(ValueError):
+        generator.get_grid(hash)
+    with pytest.raises(ValueError, match='too short|not a hex digest'):
+        generator.get_grids([valid, hash])
+
+
+def test_the_whole_hash_is_checked():
+    generator = IdenticonGenerator()
+    hash = md5(b'').hexdigest()[:15] + '/../escaped'
+    with pytest.raises(ValueError, match='not a hex digest'):
+        generator.get_grid(hash)
+    with pytest.raises(ValueError, match='not a hex digest'):
+        generator.get_grids([md5(b'').hexdigest(), hash])
+
+
+@pytest.mark.parametrize('pixels', [4, 5])
+def test_dump_from_grids_matches_dump(pixels):
+    generator = IdenticonGenerator(pixels=pixels)
+    hashes = [md5(str(i).encode()).hexdigest() for i in range(50)]
+    grids = generator.get_grids(hashes)
+    for hash, grid in zip(hashes, grids):
+        svg = generator.dump(hash, grid)
+        assert svg == generator.dump(hash)
+        assert svg.count('<rect') == len(generator.get_rectangles(hash))
@@ -0,0 +1,26 @@
+import pytest
+
+pytest.importorskip('sqlalchemy')
+
+from fourutils.sqla.types import JSONEncodedDict  # noqa: E402
+from fourutils.sqla.types.JSONEncodedDict import codecs  # noqa: E402
+
+
+def test_positional_arguments_go_to_text():
+    column = JSONEncodedDict(255)
+    assert column.impl.length == 255
+    assert column.codec == 'json'
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        JSONEncodedDict(codec='yaml')
+
+
+@pytest.mark.parametrize('codec', sorted(codecs))
+@pytest.mark.parametrize('lazy', [False, True])
+def test_round_trip(codec, lazy):
+    column = JSONEncodedDict(codec=codec, lazy=lazy)
+    value = {'a': [1, {'b': None}], 'c': 'd'}
+    loaded = column.process_result_value(column.process_bind_param(value, None), None)
+    assert (loaded.value if lazy else loaded) == value
@@ -0,0 +1,88 @@
+import asyncio
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import pytest
+
+crypto = pytest.importorskip('OpenSSL.crypto')
+Image = pytest.importorskip('PIL.Image')
+
+from fourutils.webnotifications import PushPackageBuilder  # noqa: E402
+
+WEBSITE_DICT = {
+    'websiteName': 'Test',
+    'websitePushID': 'web.com.example.test',
+    'allowedDomains': ['https://example.com'],
+    'urlFormatString': 'https://example.com/%@',
+    'webServiceURL': 'https://example.com/push',
+}
+
+
+@pytest.fixture(scope='module')
+def paths(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp('pushpackage')
+    icon_path = tmp / 'icon.png'
+    Image.new('RGBA', (512, 512), (30, 120, 200, 255)).save(icon_path)
+
+    key = crypto.PKey()
+    key.generate_key(crypto.TYPE_RSA, 2048)
+    cert = crypto.X509()
+    cert.get_subject().CN = 'fourutils test'
+    cert.set_serial_number(1)
+    cert.gmtime_adj_notBefore(0)
+    cert.gmtime_adj_notAfter(3600)
+    cert.set_issuer(cert.get_subject())
+    cert.set_pubkey(key)
+    cert.sign(key, 'sha256')
+    key_path = tmp / 'cert.pem'
+    with open(key_path, 'wb') as f:
+        f.write(crypto.dump_certificate(crypto.FILETYPE_PEM, cert))
+        f.write(crypto.dump_privatekey(crypto.FILETYPE_PEM, key))
+    return str(icon_path), str(key_path)
+
+
+def make_builder(paths, **kwargs):
+    icon_path, key_path = paths
+    return PushPackageBuilder(icon_path, WEBSITE_DICT, key_path, **kwargs)
+
+
+def names(package):
+    with zipfile.ZipFile(BytesIO(package)) as zf:
+        return sorted(zf.namelist())
+
+
+def test_stream_from_inside_the_executor(paths):
+    executor = ThreadPoolExecutor(1)
+    builder = make_builder(paths, executor=executor)
+
+    def stream():
+        return b''.join(builder.stream_pushpackage({'authenticationToken': 'a'}))
+    try:
+        package = executor.submit(stream).result(timeout=10)
+    finally:
+        # Don't wait on a deadlocked worker.
+        executor.shutdown(wait=False)
+
+    assert 'signature' in names(package)
+    assert builder.build_pushpackage(
+        merge_website_dict={'authenticationToken': 'a'}).getvalue() == package
+
+
+def test_build_async(paths):
+    with ThreadPoolExecutor(2) as executor:
+        builder = make_builder(paths, executor=executor)
+        package = asyncio.run(
+            builder.build_pushpackage_async({'authenticationToken': 'a'}))
+
+    assert names(package.getvalue()) == names(
+        b''.join(builder.stream_pushpackage({'authenticationToken': 'b'})))
+    assert len(builder.packages) == 2
+
+
+def test_resize_defaults_to_pillow(paths):
+    icon_path, _ = paths
+    builder = make_builder(paths)
+    with Image.open(icon_path) as im, BytesIO() as f:
+        im.resize((32, 32)).save(f, format='png')
+        assert builder.images['icon_32x32.png'] == f.getvalue()
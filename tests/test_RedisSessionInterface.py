@@ -0,0 +1,200 @@
+from datetime import timedelta
+
+import pytest
+
+flask = pytest.importorskip('flask')
+fakeredis = pytest.importorskip('fakeredis')
+
+from fourutils.flask import RedisSessionInterface as module  # noqa: E402
+from fourutils.flask.RedisSessionInterface import RedisSessionInterface  # noqa: E402
+
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture
+def app():
+    app = flask.Flask(__name__)
+    # Flask 2.3 dropped the attribute, the interfaces still read it.
+    app.session_cookie_name = app.config['SESSION_COOKIE_NAME']
+    return app
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(module, 'monotonic', lambda: now[0])
+    return now
+
+
+def request(app, interface, sid, view=lambda session: None):
+    with app.test_request_context(
+            headers={'Cookie': f'{app.session_cookie_name}={sid}'}):
+        from flask import request
+        session = interface.open_session(app, request)
+        view(session)
+        response = app.response_class()
+        interface.save_session(app, session, response)
+        return session, response
+
+
+def store(interface, sid, data, ttl):
+    interface.redis.set(interface.prefix + sid,
+                        interface.serializer.dumps(data), ex=ttl)
+
+
+def test_lazy_untouched_session_is_refreshed(app, redis, clock):
+    interface = RedisSessionInterface(redis, lazy=True,
+                                      refresh_interval=timedelta(minutes=5))
+    full = int(timedelta(days=1).total_seconds())
+    store(interface, 'abc', {'user': 1}, ttl=10)
+
+    # Unknown to this process, loaded once to learn its expiry.
+    session, _ = request(app, interface, 'abc')
+    assert session.loaded
+    assert redis.ttl('session:abc') == full
+
+    redis.expire('session:abc', 100)
+    session, _ = request(app, interface, 'abc')
+    assert not session.loaded
+    assert redis.ttl('session:abc') == 100
+
+    clock[0] += 301
+    session, _ = request(app, interface, 'abc')
+    assert not session.loaded
+    assert redis.ttl('session:abc') == full
+
+
+def test_lazy_read_session_is_refreshed_at_most_once_per_interval(app, redis, clock):
+    interface = RedisSessionInterface(redis, lazy=True,
+                                      refresh_interval=timedelta(minutes=5))
+    full = int(timedelta(days=1).total_seconds())
+    store(interface, 'abc', {'user': 1}, ttl=full - 10)
+
+    session, _ = request(app, interface, 'abc', lambda s: s.get('user'))
+    assert session.loaded and not session.modified
+    assert redis.ttl('session:abc') == full - 10
+
+    # Its last refresh is known from the TTL, so untouched requests wait.
+    clock[0] += 200
+    request(app, interface, 'abc')
+    assert redis.ttl('session:abc') == full - 10
+
+    clock[0] += 100
+    request(app, interface, 'abc')
+    assert redis.ttl('session:abc') == full
+
+
+def test_lazy_untouched_missing_session_is_not_created(app, redis, clock):
+    interface = RedisSessionInterface(redis, lazy=True)
+    request(app, interface, 'missing')
+    assert redis.keys('*') == []
+
+
+def test_lazy_modified_session_is_written(app, redis, clock):
+    interface = RedisSessionInterface(redis, lazy=True)
+    store(interface, 'abc', {'user': 1}, ttl=10)
+
+    def view(session):
+        session['user'] = 2
+    _, response = request(app, interface, 'abc', view)
+
+    assert interface.serializer.loads(redis.get('session:abc')) == {'user': 2}
+    assert 'abc' in response.headers['Set-Cookie']
+
+
+def test_lazy_untouched_permanent_session_refreshes_cookie(app, redis, clock):
+    interface = RedisSessionInterface(redis, lazy=True)
+    store(interface, 'abc', {'_permanent': True}, ttl=10)
+    request(app, interface, 'abc')
+
+    session, response = request(app, interface, 'abc')
+    assert not session.loaded
+    assert 'abc' in response.headers['Set-Cookie']
+    assert 'Expires=' in response.headers['Set-Cookie']
+
+    app.config['SESSION_REFRESH_EACH_REQUEST'] = False
+    _, response = request(app, interface, 'abc')
+    assert 'Set-Cookie' not in response.headers
+
+
+def test_lazy_untouched_session_cookie_is_left_alone(app, redis, clock):
+    interface = RedisSessionInterface(redis, lazy=True)
+    store(interface, 'abc', {'user': 1}, ttl=10)
+    request(app, interface, 'abc')
+
+    _, response = request(app, interface, 'abc')
+    assert 'Set-Cookie' not in response.headers
+
+
+def test_delete_forgets_refresh(app, redis, clock):
+    interface = RedisSessionInterface(redis, lazy=True)
+    store(interface, 'abc', {'user': 1}, ttl=10)
+    request(app, interface, 'abc')
+    assert 'abc' in interface.refreshed
+
+    request(app, interface, 'abc', lambda s: s.clear())
+    assert redis.get('session:abc') is None
+    assert 'abc' not in interface.refreshed
+
+
+def save(app, interface, sid, data):
+    def view(session):
+        session.clear()
+        session.update(data)
+    return request(app, interface, sid, view)
+
+
+def test_cache_hits_and_misses(app, redis):
+    interface = RedisSessionInterface(redis, cache_size=10)
+    save(app, interface, 'abc', {'user': 1})
+    assert redis.get('session:abc:version') is not None
+    interface.cache.clear()
+    stats = interface.cache.stats
+
+    assert interface.load_session_data('abc')[0] == {'user': 1}
+    assert interface.cache.stats['misses'] == stats['misses'] + 1
+    assert interface.load_session_data('abc')[0] == {'user': 1}
+    assert interface.cache.stats['hits'] == stats['hits'] + 1
+
+
+def test_cache_evicts_at_cache_size(app, redis):
+    interface = RedisSessionInterface(redis, cache_size=2)
+    for sid in ('a', 'b', 'c'):
+        save(app, interface, sid, {'sid': sid})
+
+    assert len(interface.cache) == 2
+    assert 'a' not in interface.cache
+    assert interface.cache.stats['evictions'] == 1
+    assert interface.load_session_data('a')[0] == {'sid': 'a'}
+
+
+def test_cache_detects_writes_from_other_interfaces(app, redis):
+    first = RedisSessionInterface(redis, cache_size=10)
+    second = RedisSessionInterface(redis, cache_size=10)
+    save(app, first, 'abc', {'user': 1})
+    assert first.load_session_data('abc')[0] == {'user': 1}
+
+    version = redis.get('session:abc:version')
+    save(app, second, 'abc', {'user': 2})
+    assert redis.get('session:abc:version') != version
+
+    hits = first.cache.stats['hits']
+    assert first.load_session_data('abc')[0] == {'user': 2}
+    # The stale lookup is counted as a miss.
+    assert first.cache.stats['hits'] == hits
+    assert first.cache.get('abc')[1] == {'user': 2}
+
+
+def test_delete_removes_cached_session(app, redis):
+    interface = RedisSessionInterface(redis, cache_size=10)
+    save(app, interface, 'abc', {'user': 1})
+    assert 'abc' in interface.cache
+
+    interface.delete_session_data('abc')
+    assert 'abc' not in interface.cache
+    assert redis.get('session:abc') is None
+    assert redis.get('session:abc:version') is None
+    assert interface.load_session_data('abc') == (None, None)
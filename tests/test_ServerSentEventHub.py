@@ -0,0 +1,180 @@
+import asyncio
+import threading
+
+import pytest
+
+from fourutils import ServerSentEventHub
+from fourutils.ServerSentEventHub import DISCONNECT, HEARTBEAT, RedisHubBackend
+
+
+def ids(chunks):
+    return [line.split(': ', 1)[1] for chunk in chunks
+            for line in chunk.decode().splitlines() if line.startswith('id: ')]
+
+
+def drain(subscriber):
+    with subscriber.cond:
+        events = list(subscriber.queue)
+        subscriber.queue.clear()
+    return [event.to_bytes() for event in events]
+
+
+def test_drop_oldest_keeps_newest_events():
+    hub = ServerSentEventHub(maxsize=2)
+    subscriber = hub.subscribe('news')
+    for i in range(3):
+        hub.publish('news', {'i': i})
+
+    assert subscriber.dropped == 1
+    assert not subscriber.closed
+    assert ids(drain(subscriber)) == ['2', '3']
+
+
+def test_disconnect_closes_slow_subscribers():
+    hub = ServerSentEventHub(maxsize=2, drop_policy=DISCONNECT)
+    subscriber = hub.subscribe('news')
+    for i in range(3):
+        hub.publish('news', {'i': i})
+
+    assert subscriber.closed
+    # What was queued is still delivered, then the stream ends.
+    assert ids(list(subscriber)) == ['1', '2']
+    assert 'news' not in hub.channels
+
+
+def test_unknown_drop_policy():
+    with pytest.raises(ValueError):
+        ServerSentEventHub(drop_policy='newest')
+
+
+def test_replay_from_last_event_id():
+    hub = ServerSentEventHub(replay_size=3)
+    for i in range(5):
+        hub.publish('news', {'i': i})
+
+    assert ids(drain(hub.subscribe('news', last_event_id='3'))) == ['4', '5']
+    assert ids(drain(hub.subscribe('news', last_event_id='5'))) == []
+    # Fell out of the buffer, so everything still buffered is sent.
+    assert ids(drain(hub.subscribe('news', last_event_id='1'))) == ['3', '4', '5']
+    assert drain(hub.subscribe('news')) == []
+
+
+def test_sync_iterator_sends_heartbeats():
+    hub = ServerSentEventHub(heartbeat=0.01)
+    subscriber = hub.subscribe('news')
+    stream = iter(subscriber)
+
+    assert next(stream) == HEARTBEAT
+    hub.publish('news', 'hello')
+    assert next(stream) == b'id: 1\ndata: hello\n\n'
+
+    stream.close()
+    assert 'news' not in hub.channels
+
+
+def test_async_consumer_receives_events_from_other_threads():
+    hub = ServerSentEventHub(heartbeat=0.01)
+
+    async def consume():
+        subscriber = hub.subscribe('news')
+        publisher = threading.Thread(
+            target=lambda: [hub.publish('news', f'event {i}') for i in range(3)])
+        received = []
+        async for chunk in subscriber:
+            if not received:
+                publisher.start()
+            received.append(chunk)
+            if len(ids(received)) == 3:
+                break
+        publisher.join()
+        return received
+
+    async def main():
+        return await asyncio.wait_for(consume(), 5)
+
+    # Publishing starts after the first heartbeat, so the consumer is
+    # already waiting and has to be woken from the other thread.
+    received = asyncio.run(main())
+    assert received[0] == HEARTBEAT
+    assert ids(received) == ['1', '2', '3']
+
+
+def test_redis_backend_fans_out_between_hubs():
+    fakeredis = pytest.importorskip('fakeredis')
+    server = fakeredis.FakeServer()
+    first = ServerSentEventHub(RedisHubBackend(fakeredis.FakeRedis(server=server)))
+    second = ServerSentEventHub(RedisHubBackend(fakeredis.FakeRedis(server=server)))
+    subscribers = [hub.subscribe('news') for hub in (first, second)]
+
+    first.publish('news', {'headline': 'hi'}, event='story')
+    first.publish('other', 'ignored')
+
+    for subscriber in subscribers:
+        chunk = next(iter(subscriber))
+        assert chunk == b'event: story\nid: 1\ndata: {"headline": "hi"}\n\n'
+
+
+def test_a_subscriber_with_a_closed_loop_does_not_stop_delivery():
+    hub = ServerSentEventHub()
+    broken = hub.subscribe('news')
+    loop = asyncio.new_event_loop()
+    broken.ready = asyncio.Event()
+    broken.loop = loop
+    loop.close()
+    working = hub.subscribe('news')
+
+    hub.publish('news', 'hello')
+
+    assert broken.closed
+    assert hub.channels['news'] == {working}
+    assert ids(drain(working)) == ['1']
+
+
+def test_replay_buffers_are_bounded_by_channel():
+    hub = ServerSentEventHub(replay_channels=2)
+    for channel in ('a', 'b', 'c'):
+        hub.publish(channel, 'hello')
+
+    assert len(hub.replay) == 2
+    assert 'a' not in hub.replay
+    assert ids(drain(hub.subscribe('c', last_event_id='0'))) == ['1']
+
+
+class FlakyPubSub(object):
+    r"""Drops the connection once, then delivers a single message."""
+
+    def __init__(self):
+        self.listens = 0
+        self.done = threading.Event()
+
+    def psubscribe(self, pattern):
+        pass
+
+    def listen(self):
+        self.listens += 1
+        if self.listens == 1:
+            raise ConnectionError('connection lost')
+        yield {'type': 'pmessage', 'channel': b'sse:channel:news',
+               'data': '{"id": "1", "event": null, "data": "hello"}'}
+        self.done.wait()
+
+
+class FlakyRedis(object):
+    def __init__(self):
+        self.pubsub_ = FlakyPubSub()
+
+    def pubsub(self, **kwargs):
+        return self.pubsub_
+
+
+def test_redis_backend_keeps_listening_after_a_dropped_connection():
+    redis = FlakyRedis()
+    hub = ServerSentEventHub(RedisHubBackend(redis, retry_interval=0),
+                             heartbeat=5)
+    # Replayed if the listener got there first.
+    subscriber = hub.subscribe('news', last_event_id='0')
+    try:
+        assert next(iter(subscriber)) == b'id: 1\ndata: hello\n\n'
+        assert redis.pubsub_.listens == 2
+    finally:
+        redis.pubsub_.done.set()
@@ -0,0 +1,117 @@
+import pickle
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+
+msgpack = pytest.importorskip('msgpack')
+
+from fourutils.flask.SessionSerializer import (  # noqa: E402
+    FORMAT_VERSION, SessionSerializer, register_codec)
+
+DATA = {
+    'datetime': datetime(2020, 1, 2, 3, 4, 5, 6),
+    'aware': datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    'date': date(2020, 1, 2),
+    'time': time(3, 4, 5),
+    'timedelta': timedelta(days=1, seconds=2, microseconds=3),
+    'uuid': uuid4(),
+    'set': {1, 2, 3},
+    'frozenset': frozenset({'a', 'b'}),
+    'tuple': (1, 'two', (3,)),
+    'decimal': Decimal('1.10'),
+    'nested': [{'when': date(2020, 1, 2)}, b'bytes', None, 1.5],
+}
+
+
+class Exploit(object):
+    ran = False
+
+    def __reduce__(self):
+        return setattr, (Exploit, 'ran', True)
+
+
+def header(val):
+    return val[0] >> 6, val[0] >> 2 & 0b1111, val[0] & 0b11
+
+
+@pytest.mark.parametrize('codec', ['msgpack', 'pickle'])
+def test_round_trip(codec):
+    serializer = SessionSerializer(codec)
+    loaded = serializer.loads(serializer.dumps(DATA))
+    assert loaded == DATA
+    assert {type(v) for v in loaded.values()} == {type(v) for v in DATA.values()}
+
+
+def test_subclasses_are_stored_as_their_base():
+    class Text(str):
+        pass
+    serializer = SessionSerializer()
+    assert type(serializer.loads(serializer.dumps({'a': Text('b')}))['a']) is str
+
+
+def test_compression_threshold():
+    serializer = SessionSerializer(compress_threshold=100)
+    small = serializer.dumps({'a': 'b'})
+    assert header(small) == (FORMAT_VERSION, 1, 0)
+
+    large = serializer.dumps({'a': 'b' * 1000})
+    assert header(large) == (FORMAT_VERSION, 1, 1)
+    assert len(large) < 1000
+    assert serializer.loads(large) == {'a': 'b' * 1000}
+
+    uncompressed = SessionSerializer(compression=None, compress_threshold=100)
+    assert header(uncompressed.dumps({'a': 'b' * 1000}))[2] == 0
+
+
+@pytest.mark.parametrize('protocol', range(pickle.HIGHEST_PROTOCOL + 1))
+def test_legacy_pickle(protocol):
+    serializer = SessionSerializer(legacy=('pickle', 'msgpack'))
+    val = pickle.dumps({'user': 1, 'when': date(2020, 1, 2)}, protocol=protocol)
+    assert serializer.loads(val) == {'user': 1, 'when': date(2020, 1, 2)}
+    assert serializer.needs_migration(val)
+
+
+def test_legacy_msgpack():
+    serializer = SessionSerializer()
+    val = msgpack.packb({'user': 1})
+    assert serializer.loads(val) == {'user': 1}
+    assert serializer.needs_migration(val)
+
+
+def test_msgpack_never_unpickles():
+    serializer = SessionSerializer()
+    payload = pickle.dumps({'x': Exploit()})
+    for val in (bytes((FORMAT_VERSION << 6,)) + payload, payload):
+        with pytest.raises(ValueError):
+            serializer.loads(val)
+    assert not Exploit.ran
+
+
+def test_accept_allows_other_codecs():
+    pickled = SessionSerializer('pickle').dumps({'user': 1})
+    serializer = SessionSerializer(accept=('pickle',))
+    assert serializer.loads(pickled) == {'user': 1}
+    assert serializer.needs_migration(pickled)
+
+
+def test_needs_migration():
+    serializer = SessionSerializer()
+    assert not serializer.needs_migration(serializer.dumps({'user': 1}))
+    assert serializer.needs_migration(b'')
+
+
+def test_without_header():
+    serializer = SessionSerializer(header=False, compress_threshold=0)
+    val = serializer.dumps({'user': 1, 'when': date(2020, 1, 2)})
+    assert msgpack.unpackb(val)['user'] == 1
+    assert serializer.loads(val) == {'user': 1, 'when': date(2020, 1, 2)}
+    assert not serializer.needs_migration(val)
+    # Still reads what headered workers wrote.
+    assert serializer.loads(SessionSerializer().dumps({'user': 1})) == {'user': 1}
+
+
+def test_protocol_one_pickle_codec_is_reserved():
+    with pytest.raises(ValueError):
+        register_codec(15, 'reserved', None, None)
@@ -0,0 +1,45 @@
+import pytest
+
+pytest.importorskip('flask')
+fakeredis = pytest.importorskip('fakeredis')
+
+from fourutils.flask.ShardedRedisSessionInterface import ShardedRedisSessionInterface  # noqa: E402
+
+
+@pytest.fixture
+def interface():
+    return ShardedRedisSessionInterface({
+        name: fakeredis.FakeRedis() for name in ('one', 'two', 'three')})
+
+
+def test_generated_sids_route_to_their_hint(interface):
+    for _ in range(50):
+        sid = interface.generate_sid()
+        hint = sid.partition('.')[0]
+        assert hint in interface.shards
+        assert interface.get_redis(sid) is interface.shards[hint]
+
+
+def test_hint_survives_adding_shards(interface):
+    sids = [interface.generate_sid() for _ in range(50)]
+    interface.add_shard('four', fakeredis.FakeRedis())
+    for sid in sids:
+        assert interface.get_shard_name(sid) == sid.partition('.')[0]
+
+
+def test_unknown_hint_falls_back_to_ring(interface):
+    assert interface.get_shard_name('gone.abc') == interface.ring.get_node('gone.abc')
+    assert interface.get_shard_name('legacy-sid') == interface.ring.get_node('legacy-sid')
+
+
+def test_sessions_are_written_to_their_shard(interface):
+    sid = 'two.abc'
+    interface.write_session_data(sid, {'user': 1}, interface.refresh_interval * 100)
+    assert interface.shards['two'].get('session:two.abc') is not None
+    assert interface.shards['one'].get('session:two.abc') is None
+    assert interface.load_session_data(sid)[0] == {'user': 1}
+
+
+def test_invalid_shard_names(interface):
+    with pytest.raises(ValueError):
+        interface.add_shard('a.b', fakeredis.FakeRedis())
@@ -0,0 +1,93 @@
+import os
+import socket
+import threading
+from datetime import datetime, timedelta, timezone
+from hashlib import md5
+
+import pytest
+
+from fourutils import SortableIdGenerator
+from fourutils.base36 import BASE36
+
+ids = SortableIdGenerator()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [SortableIdGenerator.EPOCH + 1000]
+    monkeypatch.setattr('time.time_ns', lambda: now[0] * 1000000)
+    return now
+
+
+def test_ids_sort_by_time(clock):
+    generated = []
+    for _ in range(50):
+        generated.extend(ids.generate() for _ in range(3))
+        clock[0] += 1
+    assert sorted(generated) == generated
+    assert len(set(generated)) == len(generated)
+    assert len({len(id) for id in generated}) == 1
+
+
+def test_ids_sort_with_other_alphabets(clock):
+    generator = SortableIdGenerator(node_id=1, alphabet=BASE36)
+    first = generator.generate()
+    clock[0] += 10 ** 9
+    assert first < generator.generate()
+
+
+def test_get_datetime_round_trip(clock):
+    when = datetime(2024, 5, 6, 7, 8, 9, 123000, tzinfo=timezone.utc)
+    clock[0] = int(when.timestamp() * 1000)
+    assert ids.get_datetime(ids.generate()) == when
+
+
+def test_get_datetime_of_now():
+    now = datetime.now(timezone.utc)
+    assert abs(ids.get_datetime(ids.generate()) - now) < timedelta(seconds=1)
+
+
+def test_node_id():
+    generator = SortableIdGenerator(node_id=5)
+    assert generator.node_id == 5
+    with pytest.raises(ValueError):
+        SortableIdGenerator(node_id=1 << SortableIdGenerator.NODE_BITS)
+
+
+def test_unique_across_threads():
+    results = [[] for _ in range(8)]
+
+    def generate(into):
+        into.extend(ids.generate() for _ in range(5000))
+    threads = [threading.Thread(target=generate, args=(into,)) for into in results]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    generated = [id for into in results for id in into]
+    assert len(set(generated)) == len(generated)
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs os.fork')
+def test_reset_after_fork():
+    generator = SortableIdGenerator()
+    counter = generator.counter
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read)
+            reset = generator.counter is not counter
+            os.write(write, f'{generator.node_id} {reset:d}'.encode())
+        finally:
+            os._exit(0)
+
+    os.close(write)
+    with os.fdopen(read) as f:
+        node_id, reset = f.read().split()
+    os.waitpid(pid, 0)
+    assert reset == '1'
+    digest = md5(f'{socket.gethostname()}:{pid}'.encode()).digest()
+    assert int(node_id) == int.from_bytes(digest[:4], 'big') & \
+        ((1 << SortableIdGenerator.NODE_BITS) - 1)
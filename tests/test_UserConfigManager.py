@@ -0,0 +1,97 @@
+import importlib
+
+import pytest
+
+pytest.importorskip('sqlalchemy')
+fakeredis = pytest.importorskip('fakeredis')
+pytest.importorskip('msgpack')
+
+from sqlalchemy import Column, LargeBinary, String, create_engine  # noqa: E402
+from sqlalchemy.orm import declarative_base, scoped_session, sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from fourutils.sqla import RedisCacheVersion, UserConfigManager  # noqa: E402
+
+module = importlib.import_module('fourutils.sqla.UserConfigManager')
+
+Base = declarative_base()
+
+
+class Config(Base):
+    __tablename__ = 'config'
+    key = Column(String(64), primary_key=True)
+    value = Column(LargeBinary)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine('sqlite://', poolclass=StaticPool,
+                           connect_args={'check_same_thread': False})
+    Base.metadata.create_all(engine)
+    return scoped_session(sessionmaker(engine))
+
+
+@pytest.fixture
+def version():
+    return RedisCacheVersion(fakeredis.FakeRedis())
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(module, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_writes_are_seen_by_other_managers(session, version):
+    first = UserConfigManager(session, Config, defaults={'theme': 'light'},
+                              version=version)
+    second = UserConfigManager(session, Config, defaults={'theme': 'light'},
+                               version=version)
+    assert first.get('theme') == 'light'
+    assert second.get('theme') == 'light'
+
+    first.set('theme', 'dark')
+    assert version.get() == 1
+    assert first.get('theme') == 'dark'
+    assert second.get('theme') == 'dark'
+
+    second.set_many({'theme': 'blue', 'lang': 'en'})
+    assert first.get_many(['theme', 'lang']) == {'theme': 'blue', 'lang': 'en'}
+
+
+def test_writer_keeps_its_cache_when_it_made_the_only_change(session, version):
+    manager = UserConfigManager(session, Config, defaults={'a': 0, 'b': 0},
+                                version=version)
+    assert manager.get_many(['a', 'b']) == {'a': 0, 'b': 0}
+    manager.set('a', 1)
+    manager.set('b', 2)
+    assert manager.cache == {'a': 1, 'b': 2}
+    assert manager.cache_version == version.get()
+
+
+def test_check_interval_limits_version_checks(session, version, clock):
+    first = UserConfigManager(session, Config, defaults={'theme': 'light'},
+                              version=version)
+    second = UserConfigManager(session, Config, defaults={'theme': 'light'},
+                               version=version, check_interval=10)
+    assert second.get('theme') == 'light'
+    first.set('theme', 'dark')
+
+    assert second.get('theme') == 'light'
+    clock[0] += 11
+    assert second.get('theme') == 'dark'
+
+
+def test_ttl_expiry_drops_the_cache(session, clock):
+    manager = UserConfigManager(session, Config, defaults={}, ttl=60)
+    manager.set('theme', 'dark')
+    assert manager.get('theme') == 'dark'
+
+    # Written behind the manager's back, so only expiry picks it up.
+    session.merge(Config(key='theme', value=manager.encode('blue')))
+    session.commit()
+    clock[0] += 30
+    assert manager.get('theme') == 'dark'
+    clock[0] += 31
+    assert manager.get('theme') == 'blue'
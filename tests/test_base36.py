@@ -0,0 +1,99 @@
+import importlib
+
+import pytest
+
+from fourutils.base36 import BASE36, BASE62, CROCKFORD
+
+base36 = importlib.import_module('fourutils.base36')
+
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+EDGES = [0, 1, -1, 35, 36, -36, 61, 62, 1295, 1296, 2 ** 32, -2 ** 32,
+         INT64_MAX, INT64_MIN + 1, INT64_MIN]
+ALPHABETS = [BASE36, BASE62, CROCKFORD]
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def numpy(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(base36, 'np', None)
+    return request.param == 'numpy'
+
+
+@pytest.mark.parametrize('alphabet', ALPHABETS)
+def test_single_round_trip(alphabet):
+    for number in EDGES:
+        encoded = base36.base36encode(number, alphabet)
+        assert base36.base36decode(encoded, alphabet) == number
+
+
+@pytest.mark.parametrize('alphabet', ALPHABETS)
+def test_many_round_trip(numpy, alphabet):
+    encoded = base36.encode_many(EDGES, alphabet)
+    assert encoded == [base36.base36encode(n, alphabet) for n in EDGES]
+    assert list(base36.decode_many(encoded, alphabet)) == EDGES
+
+
+@pytest.mark.parametrize('alphabet', ALPHABETS)
+def test_many_padding(numpy, alphabet):
+    zero = alphabet[0]
+    assert base36.encode_many([1, -1, 0], alphabet, width=4) == [
+        zero * 3 + alphabet[1], '-' + zero * 3 + alphabet[1], zero * 4]
+    # Padded to the longest number when it's wider.
+    longest = base36.base36encode(INT64_MIN, alphabet)
+    padded = base36.encode_many([0, INT64_MIN], alphabet, width=0)
+    assert padded == [zero * (len(longest) - 1), longest]
+    assert list(base36.decode_many(padded, alphabet)) == [0, INT64_MIN]
+
+
+def test_many_from_buffer():
+    np = pytest.importorskip('numpy')
+    buffer = np.array(EDGES, dtype=np.int64).tobytes()
+    assert base36.encode_many(buffer) == [base36.base36encode(n) for n in EDGES]
+
+
+def test_many_empty(numpy):
+    assert list(base36.encode_many([])) == []
+    assert list(base36.decode_many([])) == []
+
+
+def test_many_overflow(numpy):
+    too_big = base36.base36encode(2 ** 63)
+    with pytest.raises(OverflowError):
+        base36.decode_many([too_big])
+    with pytest.raises(OverflowError):
+        base36.decode_many(['1' + '0' * 20])
+    assert list(base36.decode_many(['-' + too_big])) == [INT64_MIN]
+
+
+@pytest.mark.parametrize('number', ['', '-', '1_0', ' 10', '+10', '--1', '1-0'])
+def test_many_rejects_invalid(numpy, number):
+    with pytest.raises(ValueError):
+        base36.decode_many(['10', number])
+
+
+def test_single_default_alphabet_goes_through_int():
+    assert base36.base36decode('1_0') == 36
+    assert base36.base36decode(' +10 ') == 36
+    with pytest.raises(ValueError):
+        base36.base36decode('1_0', CROCKFORD)
+
+
+def test_crockford_aliases(numpy):
+    assert base36.base36decode('IlOo', CROCKFORD) == \
+        base36.base36decode('1100', CROCKFORD)
+    assert list(base36.decode_many(['IlOo', 'abc'], CROCKFORD)) == [
+        base36.base36decode('1100', CROCKFORD),
+        base36.base36decode('ABC', CROCKFORD)]
+    with pytest.raises(ValueError):
+        base36.decode_many(['U'], CROCKFORD)
+
+
+def test_custom_alphabets_are_honoured():
+    assert base36.base36decode('ba', 'ab') == 2
+    assert base36.base36encode(2, 'ab') == 'ba'
+    # BASE62 is case sensitive, unlike BASE36.
+    assert base36.base36decode('a', BASE62) != base36.base36decode('A', BASE62)
+    assert base36.base36decode('a') == base36.base36decode('A')